@@ -0,0 +1,35 @@
+"""
+Check that code_from_ipynb scales linearly with the number of cells.
+
+Run with `python benchmarks/bench_code_from_ipynb.py` after a developer
+install. The time per cell should stay roughly flat as the notebooks get bigger.
+"""
+import timeit
+
+from ipynb.utils import code_from_ipynb
+
+
+def make_nb(n_cells):
+    """
+    Return a parsed notebook with n_cells, alternating code and markdown
+    """
+    cells = []
+    for i in range(n_cells):
+        if i % 2:
+            cells.append({'cell_type': 'markdown', 'source': ['# Cell {}\n'.format(i), 'Some text']})
+        else:
+            cells.append({'cell_type': 'code', 'source': ['x{} = {}\n'.format(i, i), 'print(x{})'.format(i)]})
+    return {'nbformat': 4, 'metadata': {}, 'cells': cells}
+
+
+def main():
+    print('{:>8} {:>12} {:>14}'.format('cells', 'total (ms)', 'per cell (us)'))
+    for n_cells in (100, 1000, 5000, 10000):
+        nb = make_nb(n_cells)
+        number = max(1, 10000 // n_cells)
+        seconds = min(timeit.repeat(lambda: code_from_ipynb(nb), number=number, repeat=5)) / number
+        print('{:>8} {:>12.2f} {:>14.3f}'.format(n_cells, seconds * 1e3, seconds / n_cells * 1e6))
+
+
+if __name__ == '__main__':
+    main()
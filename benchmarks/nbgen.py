@@ -0,0 +1,63 @@
+"""
+Generate synthetic notebooks for the benchmarks.
+"""
+import os
+import json
+import base64
+
+
+def make_notebook(n_cells, source_lines=5, output_bytes=0):
+    """
+    Return the JSON for a notebook with n_cells
+
+    Every other cell is a code cell with source_lines lines, alternating
+    function definitions and top level statements, and an image output of
+    about output_bytes. The others are markdown cells.
+    """
+    payload = base64.b64encode(os.urandom(output_bytes * 3 // 4)).decode('ascii')
+    cells = []
+    for i in range(n_cells):
+        if i % 2:
+            cells.append({
+                'cell_type': 'markdown',
+                'metadata': {},
+                'source': ['## Section {}\n'.format(i), 'Some explanations'],
+            })
+            continue
+        if i % 4:
+            source = ['def f{}(x):\n'.format(i)]
+            source += ['    x = x + {}\n'.format(j) for j in range(source_lines - 2)]
+            source += ['    return x']
+        else:
+            source = ['v{}_{} = {}\n'.format(i, j, j) for j in range(source_lines - 1)]
+            source += ['w{} = v{}_0 + 1'.format(i, i)]
+        outputs = []
+        if output_bytes:
+            outputs.append({
+                'output_type': 'display_data',
+                'metadata': {},
+                'data': {'image/png': payload, 'text/plain': ['<Figure>']},
+            })
+        cells.append({
+            'cell_type': 'code',
+            'execution_count': i,
+            'metadata': {},
+            'outputs': outputs,
+            'source': source,
+        })
+    return json.dumps({
+        'cells': cells,
+        'metadata': {'kernelspec': {'display_name': 'Python 3', 'language': 'python', 'name': 'python3'}},
+        'nbformat': 4,
+        'nbformat_minor': 2,
+    }, indent=1)
+
+
+def write_notebook(directory, name, *args, **kwargs):
+    """
+    Write a notebook made by make_notebook in directory, returning its path
+    """
+    path = os.path.join(directory, name + '.ipynb')
+    with open(path, 'w') as f:
+        f.write(make_notebook(*args, **kwargs))
+    return path
@@ -0,0 +1,184 @@
+"""
+Benchmarks for the hot paths of importing notebooks.
+
+    python benchmarks/run.py [--save results.json] [--compare baseline.json]
+
+Run after a developer install. Notebooks of different sizes are generated by
+nbgen.py in a temporary directory. Every benchmark is run a few times and the
+fastest run is kept. With --compare, results more than --tolerance slower
+than the baseline are reported and the exit status is 1.
+"""
+import os
+import sys
+import ast
+import json
+import shutil
+import argparse
+import tempfile
+import importlib
+import timeit
+
+from nbgen import write_notebook
+
+import ipynb.fs.defs
+import ipynb.fs.loader
+from ipynb.fs.finder import FSFinder
+from ipynb.fs.full import FullLoader
+from ipynb.reader import read_notebook, parse_cache
+from ipynb.utils import code_from_ipynb, filter_ast
+
+
+# name -> (n_cells, source_lines, output_bytes)
+NOTEBOOKS = {
+    'small': (10, 5, 0),
+    'large': (1000, 5, 0),
+    'long_cells': (100, 200, 0),
+    'heavy_outputs': (50, 5, 500000),
+}
+
+SYS_PATH_LENGTHS = (1, 50)
+
+
+def best_of(func, repeat=5, number=None):
+    """
+    Return the fastest time for one call of func, in seconds
+    """
+    if number is None:
+        number, _ = timeit.Timer(func).autorange()
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def forget(prefix):
+    """
+    Remove modules under prefix from sys.modules
+    """
+    for name in list(sys.modules):
+        if name.startswith(prefix):
+            del sys.modules[name]
+
+
+def bench_find_spec(workdir, results):
+    for length in SYS_PATH_LENGTHS:
+        padding = []
+        for i in range(length - 1):
+            padding.append(os.path.join(workdir, 'empty{}'.format(i)))
+            os.makedirs(padding[-1], exist_ok=True)
+        finder = FSFinder('ipynb.fs.full', FullLoader)
+        saved = sys.path[:]
+        # the notebooks are at the end, so every entry gets looked at
+        sys.path[:] = padding + [workdir]
+        try:
+            results['find_spec.hit.sys_path_{}'.format(length)] = best_of(
+                lambda: finder.find_spec('ipynb.fs.full.small', None))
+            results['find_spec.miss.sys_path_{}'.format(length)] = best_of(
+                lambda: finder.find_spec('ipynb.fs.full.missing', None))
+            results['find_spec.other_module.sys_path_{}'.format(length)] = best_of(
+                lambda: finder.find_spec('json.decoder', None))
+        finally:
+            sys.path[:] = saved
+
+
+def bench_notebook(workdir, name, results):
+    path = os.path.join(workdir, name + '.ipynb')
+    with open(path, 'rb') as f:
+        data = f.read()
+    nb = read_notebook(data)
+    source = code_from_ipynb(nb)
+
+    results['read_notebook.' + name] = best_of(lambda: read_notebook(data))
+    results['json.loads.' + name] = best_of(lambda: json.loads(data.decode('utf-8')))
+    results['code_from_ipynb.' + name] = best_of(lambda: code_from_ipynb(nb))
+    results['filter_ast.' + name] = best_of(lambda: filter_ast(ast.parse(source)))
+
+    for flavor in ('full', 'defs'):
+        fullname = 'ipynb.fs.{}.{}'.format(flavor, name)
+
+        def cold_import():
+            forget(fullname)
+            shutil.rmtree(os.path.join(workdir, '__pycache__'), ignore_errors=True)
+            # the in memory caches of previous imports
+            ipynb.fs.defs._filtered_cells.clear()
+            ipynb.fs.loader._codes.clear()
+            parse_cache.clear()
+            importlib.import_module(fullname)
+
+        def warm_import():
+            forget(fullname)
+            importlib.import_module(fullname)
+
+        results['import.cold.{}.{}'.format(flavor, name)] = best_of(cold_import, number=1)
+        importlib.import_module(fullname)
+        results['import.warm.{}.{}'.format(flavor, name)] = best_of(warm_import)
+
+
+def run():
+    """
+    Run all the benchmarks, returning {benchmark name: seconds}
+    """
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='ipynb-bench-')
+    sys.path.insert(0, workdir)
+    saved_dont_write_bytecode = sys.dont_write_bytecode
+    sys.dont_write_bytecode = False
+    try:
+        for name, args in NOTEBOOKS.items():
+            write_notebook(workdir, name, *args)
+        importlib.invalidate_caches()
+        bench_find_spec(workdir, results)
+        for name in NOTEBOOKS:
+            bench_notebook(workdir, name, results)
+    finally:
+        sys.dont_write_bytecode = saved_dont_write_bytecode
+        sys.path.remove(workdir)
+        shutil.rmtree(workdir)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print results next to baseline, returning the names of those that regressed
+    """
+    regressions = []
+    print('{:<45} {:>12} {:>12} {:>8}'.format('benchmark', 'baseline', 'current', 'change'))
+    for name, seconds in sorted(results.items()):
+        if name not in baseline:
+            print('{:<45} {:>12} {:>12.1f}'.format(name, '-', seconds * 1e6))
+            continue
+        change = seconds / baseline[name] - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = ' !!'
+        print('{:<45} {:>12.1f} {:>12.1f} {:>+7.0%}{}'.format(name, baseline[name] * 1e6, seconds * 1e6, change, flag))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command line entry point, returns the process exit status
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of importing notebooks.')
+    parser.add_argument('--save', metavar='FILE', help='write the results to FILE, as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='compare the results to a baseline saved with --save')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown over the baseline considered a regression (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    results = run()
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print('\n{} benchmark(s) regressed: {}'.format(len(regressions), ', '.join(regressions)))
+            return 1
+    else:
+        for name, seconds in sorted(results.items()):
+            print('{:<45} {:>12.1f} us'.format(name, seconds * 1e6))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Import notebooks from asyncio code without blocking the event loop.
+
+```
+from ipynb.aio import import_notebook
+
+module = await import_notebook('ipynb.fs.defs.pkg.notebook')
+modules = await asyncio.gather(*(import_notebook(name) for name in names))
+```
+
+Reading, parsing and compiling a notebook is done in an executor, the loop's
+default one unless another is given. Only executing the module's code happens
+on the event loop's thread, like for a regular import. Parent packages are
+imported first, and importing a notebook that's already being imported waits
+for that import rather than starting another one.
+
+With a ProcessPoolExecutor, notebooks are compiled in the worker processes
+and the code sent back. Only whole notebooks are compiled there: when the
+import executes cells one by one or lazily, as with ipynb.config.per_cell or
+ipynb.config.lazy_defs, that work is done in the loop's default executor.
+"""
+import sys
+import asyncio
+import marshal
+import weakref
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+from ipynb.fs.finder import find_spec
+from ipynb.fs.loader import NotebookLoader, remember_code
+
+# event loop -> {module name: task importing it}
+_pending = weakref.WeakKeyDictionary()
+
+
+async def import_notebook(fullname, executor=None):
+    """
+    Import the module called fullname and return it, like importlib.import_module
+
+    Anything but executing the module is done in executor.
+    """
+    module = sys.modules.get(fullname)
+    if module is not None:
+        return module
+    loop = asyncio.get_running_loop()
+    pending = _pending.setdefault(loop, {})
+    task = pending.get(fullname)
+    if task is None:
+        task = pending[fullname] = loop.create_task(_import(fullname, executor))
+        task.add_done_callback(lambda _: pending.pop(fullname, None))
+    # Another caller might be waiting for the same import
+    return await asyncio.shield(task)
+
+
+async def _import(fullname, executor):
+    parent = fullname.rpartition('.')[0]
+    if parent and parent not in sys.modules:
+        await import_notebook(parent, executor)
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        compiled = await loop.run_in_executor(executor, _compile, fullname)
+        if compiled is not None:
+            path, flavor, stats, data = compiled
+            remember_code(path, flavor, stats, marshal.loads(data))
+        else:
+            await loop.run_in_executor(None, _warm, fullname)
+    else:
+        await loop.run_in_executor(executor, _warm, fullname)
+    return importlib.import_module(fullname)
+
+
+def _spec(fullname):
+    """
+    Return the spec of fullname if it's to be loaded by a NotebookLoader
+    """
+    spec = find_spec(fullname)
+    if spec is not None and isinstance(spec.loader, NotebookLoader):
+        return spec
+    return None
+
+
+def _warm(fullname):
+    spec = _spec(fullname)
+    if spec is not None:
+        spec.loader.warm(fullname)
+
+
+def _compile(fullname):
+    """
+    Return (path, flavor, stats, marshalled code) of a notebook, or None
+
+    None when the import won't execute the notebook's whole code. Runs in
+    worker processes. Code objects can't be pickled, so they're sent
+    back marshalled.
+    """
+    spec = _spec(fullname)
+    if spec is None or not spec.origin.endswith('.ipynb') or not spec.loader.executes_whole_code():
+        return None
+    loader = spec.loader
+    stats = loader.path_stats(loader.path)
+    return loader.path, loader.flavor, stats, marshal.dumps(loader.get_code(fullname))
@@ -0,0 +1,126 @@
+"""
+Compile notebooks ahead of time, like the compileall module does for .py files.
+
+    python -m ipynb.compileall [-j N] [-f] [-q] DIR_OR_NOTEBOOK [...]
+
+Walks the given directories for notebooks that can be imported, and writes the
+cached code for each of the ipynb.fs flavors, so that importing them later
+doesn't need to parse nor compile anything.
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Imported to register the built in flavors with ipynb.fs.finder
+import ipynb.fs.full  # pylint: disable=unused-import
+import ipynb.fs.defs  # pylint: disable=unused-import
+import ipynb.fs.tagged  # pylint: disable=unused-import
+from ipynb.fs import cache
+from ipynb.fs.finder import finder
+from ipynb.utils import fingerprint
+
+
+# flavor -> (package prefix, loader class), for every flavor registered with
+# ipynb.fs.finder, which the built in ones are once imported
+FLAVORS = {
+    loader_class.flavor: (prefix, loader_class)
+    for prefix, loader_class in finder.flavors.items()
+}
+
+
+def find_notebooks(path):
+    """
+    Generate the paths of all importable notebooks under path
+
+    Same as FSFinder, only notebooks & directories with names that are valid
+    module names are considered.
+    """
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d.isidentifier())
+        for filename in sorted(files):
+            name, ext = os.path.splitext(filename)
+            if ext == '.ipynb' and name.isidentifier():
+                yield os.path.join(root, filename)
+
+
+def compile_notebook(path, flavors=tuple(FLAVORS), force=False):
+    """
+    Write the cached code of the notebook at path for each of the flavors
+
+    Returns a list of error messages, empty if everything went fine.
+    """
+    errors = []
+    fullname = os.path.splitext(os.path.basename(path))[0]
+    for flavor in flavors:
+        prefix, loader_class = FLAVORS[flavor]
+        loader = loader_class('{}.{}'.format(prefix, fullname), path)
+        try:
+            stats = loader.path_stats(path)
+            if not force and cache.load_code(path, loader.flavor, stats) is not None:
+                continue
+            nb = loader.load_notebook(loader.name)
+            code = loader.code_from_notebook(nb)
+        except (ImportError, SyntaxError, OSError) as e:
+            errors.append('{path} ({flavor}): {error}'.format(path=path, flavor=flavor, error=e))
+            continue
+        # Some loaders cache their code under their own flavor, see ipynb.fs.tagged
+        cache.store_code(path, loader.flavor, stats, fingerprint(nb), code, force=True)
+    return errors
+
+
+def compile_all(paths, flavors=tuple(FLAVORS), force=False, jobs=1):
+    """
+    Compile all the notebooks under paths, with jobs worker processes
+
+    jobs=0 uses as many processes as there are CPUs. Generates the notebooks'
+    paths along with the list of errors for each.
+    """
+    notebooks = [nb for path in paths for nb in find_notebooks(path)]
+    if jobs == 1:
+        for notebook in notebooks:
+            yield notebook, compile_notebook(notebook, flavors, force)
+        return
+    with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+        results = executor.map(
+            compile_notebook,
+            notebooks,
+            [flavors] * len(notebooks),
+            [force] * len(notebooks),
+            chunksize=16
+        )
+        yield from zip(notebooks, results)
+
+
+def main(argv=None):
+    """
+    Command line entry point, returns the process exit status
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m ipynb.compileall',
+        description='Write the cached code of notebooks ahead of importing them.'
+    )
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='directories to walk, or notebooks')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU')
+    parser.add_argument('-f', '--force', action='store_true', help='compile even if the cache is up to date')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only print errors')
+    parser.add_argument('--flavor', action='append', choices=sorted(FLAVORS),
+                        help='only compile for this flavor, can be given more than once')
+    args = parser.parse_args(argv)
+
+    success = True
+    for notebook, errors in compile_all(args.paths, tuple(args.flavor or FLAVORS), args.force, args.jobs):
+        if not args.quiet:
+            print('Compiling {}'.format(notebook))
+        for error in errors:
+            print('*** ' + error, file=sys.stderr)
+            success = False
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
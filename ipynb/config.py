@@ -0,0 +1,38 @@
+"""
+Switches changing how notebooks get imported.
+
+They're looked at every time a notebook is imported, so set them before the
+imports they should apply to:
+
+```
+import ipynb.config
+ipynb.config.per_cell = True
+```
+"""
+
+# Compile and execute each code cell on its own, caching the code per cell,
+# so editing a cell only recompiles that cell.
+per_cell = False
+
+# Don't execute anything when importing from ipynb.fs.defs. Each definition is
+# executed when it is first accessed, with the imports & definitions it uses.
+lazy_defs = False
+
+# Load the notebooks a notebook imports in background threads, while it's
+# being loaded & executed, so they're ready by the time it imports them. Helps
+# most when reading files is slow, like on network filesystems.
+prefetch = False
+
+# Cells ipynb.fs.tagged leaves out: the ones with any of these tags in their
+# metadata. If include_tags isn't None, only the cells with one of those tags
+# are kept, as long as they don't have an excluded one.
+exclude_tags = frozenset(['skip-import', 'heavy'])
+include_tags = None
+
+# Keep what each cell of an ipynb.fs.full notebook computes in a cache, and
+# restore it on later imports instead of executing the cell again, see
+# ipynb.fs.memo. The cache is kept in memo_dir, ~/.cache/ipynb/cells for None,
+# and trimmed to memo_max_size bytes, least recently used first.
+memoize_cells = False
+memo_dir = None
+memo_max_size = 1 << 30
@@ -0,0 +1,167 @@
+"""
+Loaders for notebooks packed into a single bundle file.
+
+```
+$ python -m ipynb.pack -o notebooks.nbb notebooks/
+```
+
+```
+import ipynb.fs.finder
+ipynb.fs.finder.add_bundle('notebooks.nbb')
+
+import ipynb.fs.full.pkg.notebook
+```
+
+A bundle holds the modules of a whole tree of notebooks, each with the code
+compiled for every flavor and the importable parts of the notebook, without
+outputs, to fall back on. Its index is read once, when it's added to the
+finder; after that, finding a module is a dict lookup and loading it a slice
+of the memory-mapped file. Nothing else is opened or stat'ed.
+
+A bundle is a snapshot of the notebooks, like a zip archive: changes to them
+only show once the bundle is packed again. Code compiled by another version of
+python is ignored, and the notebooks compiled again on import.
+"""
+import os
+import mmap
+import struct
+import marshal
+import collections
+from importlib.util import MAGIC_NUMBER
+
+from ipynb.fs import cache
+from ipynb.fs.loader import ReadOnlyLoaderMixin
+
+# file magic, our own format tag, python bytecode magic, index offset & size
+_HEADER = struct.Struct('<4s4s4sQQ')
+_MAGIC = b'NBBL'
+_FORMAT = b'nb01'
+
+# One module in a bundle. path is relative to the bundle, with / separators,
+# source & codes are (offset, size) of the notebook or .py source, and of the
+# code for each flavor.
+BundleEntry = collections.namedtuple('BundleEntry', 'path mtime size fingerprint source codes')
+
+
+class Bundle:
+    """
+    An open bundle file along with its index
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < _HEADER.size:
+            raise ValueError('{} is not an ipynb bundle'.format(path))
+        magic, fmt, python_magic, index_offset, index_size = _HEADER.unpack_from(self.data)
+        if (magic, fmt) != (_MAGIC, _FORMAT):
+            raise ValueError('{} is not an ipynb bundle'.format(path))
+        # The notebooks are still there if the code is for another python
+        self.has_code = python_magic == MAGIC_NUMBER
+        try:
+            index = marshal.loads(self.data[index_offset:index_offset + index_size])
+        except (EOFError, ValueError, TypeError):
+            raise ValueError('{} is a corrupt ipynb bundle'.format(path))
+        # module name, relative to the package prefix -> BundleEntry
+        self.modules = {name: BundleEntry(*entry) for name, entry in index.items()}
+        # origin of each module -> BundleEntry
+        self.origins = {self.origin(entry): entry for entry in self.modules.values()}
+
+    def origin(self, entry):
+        """
+        Return the path of the module for entry, under the bundle's
+        """
+        return os.path.join(self.path, *entry.path.split('/'))
+
+    def read(self, span):
+        """
+        Return the bytes at the (offset, size) span of the bundle
+        """
+        offset, size = span
+        return self.data[offset:offset + size]
+
+    def code(self, entry, flavor):
+        """
+        Return the code compiled for entry as flavor, or None
+        """
+        if not self.has_code or flavor not in entry.codes:
+            return None
+        try:
+            return marshal.loads(self.read(entry.codes[flavor]))
+        except (EOFError, ValueError, TypeError):
+            return None
+
+
+def write_bundle(path, modules):
+    """
+    Write a bundle of modules at path
+
+    modules maps each module name, relative to the package prefix, to a dict
+    with the module's `path` relative to the bundle, the `source` bytes (the
+    importable parts of a notebook, as JSON, or a .py file), the `stats` and
+    `fingerprint` of the notebook it comes from, and the `codes` compiled for
+    each flavor.
+    """
+    blobs = []
+    offset = _HEADER.size
+    index = {}
+
+    def add(data):
+        nonlocal offset
+        blobs.append(data)
+        span = (offset, len(data))
+        offset += len(data)
+        return span
+
+    for name, module in sorted(modules.items()):
+        index[name] = (
+            module['path'],
+            module['stats']['mtime'],
+            module['stats']['size'],
+            module['fingerprint'],
+            add(module['source']),
+            {flavor: add(marshal.dumps(code)) for flavor, code in sorted(module['codes'].items())},
+        )
+    index_data = marshal.dumps(index)
+    header = _HEADER.pack(_MAGIC, _FORMAT, MAGIC_NUMBER, offset, len(index_data))
+    cache.write_atomic(path, b''.join([header] + blobs + [index_data]))
+
+
+class BundleLoaderMixin(ReadOnlyLoaderMixin):
+    """
+    Mixin for NotebookLoader classes, loading the modules from a Bundle
+
+    The container is the Bundle. The code packed for the loader's flavor is
+    used as the cached code.
+    """
+    kind = 'Bundle'
+
+    def get_data(self, path):
+        """
+        Return the contents of the file at path, from the bundle
+        """
+        entry = self.container.origins.get(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return self.container.read(entry.source)
+
+    def path_stats(self, path):
+        """
+        Return the stats the file at path had when it was packed
+        """
+        entry = self.container.origins.get(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return {'mtime': entry.mtime, 'size': entry.size}
+
+    def load_cached_code(self, stats, nb_fingerprint=None):
+        """
+        Return the code packed for the loader's flavor, or None
+        """
+        return self.container.code(self.container.origins[self.path], self.flavor)
+
+    def load_cached_cells(self):
+        """
+        Return no cells, only whole notebooks are packed
+        """
+        return {}
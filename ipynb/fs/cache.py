@@ -0,0 +1,168 @@
+"""
+On-disk cache of compiled notebook code, the .ipynb equivalent of __pycache__.
+
+Code objects are stored next to the notebook, in the same __pycache__ directory
+python itself uses, one file per loader flavor:
+
+    __pycache__/<notebook>.ipynb-<flavor>.<cache tag>.pyc
+
+Each file starts with a small header recording the stats and the fingerprint
+(see ipynb.utils.fingerprint) of the notebook it was produced from. A cached
+entry is used when the stats still match. When they don't, the notebook might
+just have been re-run, so the entry is still used if the fingerprint matches.
+
+When cells are compiled one by one (see ipynb.config.per_cell), their code is
+kept in a separate file per flavor, keyed by the hash of each cell's source.
+"""
+import sys
+import os
+import struct
+import threading
+import marshal
+from importlib.util import MAGIC_NUMBER, cache_from_source
+
+# python bytecode magic, our own format tag, notebook mtime, size & fingerprint
+_HEADER = struct.Struct('<4s4sdq20s')
+_FORMAT = b'nb02'
+# Cells are cached by the hash of their source, so there's nothing to check
+# but whether the file was written by this python.
+_CELLS_HEADER = struct.Struct('<4s4s')
+
+
+def cache_path(path, flavor):
+    """
+    Return the path code for notebook `path` loaded as `flavor` is cached at
+
+    Returns None when this interpreter doesn't do bytecode caching.
+    """
+    root, _ = os.path.splitext(path)
+    try:
+        return cache_from_source('{root}.ipynb-{flavor}.py'.format(root=root, flavor=flavor))
+    except NotImplementedError:
+        # sys.implementation.cache_tag is None
+        return None
+
+
+def load_code(path, flavor, stats, fingerprint=None):
+    """
+    Return the cached code object for the notebook at `path`
+
+    `stats` is the notebook's path_stats() dict. If they don't match the cached
+    entry's, it's still a hit if `fingerprint` is given and matches. Returns
+    None on a cache miss, including when the cached entry was produced from a
+    different version of the notebook or by a different python.
+    """
+    cpath = cache_path(path, flavor)
+    return unpack_code(_read(cpath) if cpath is not None else None, stats, fingerprint)
+
+
+def unpack_code(data, stats, fingerprint=None, mtime_slack=0):
+    """
+    Return the code object in `data`, the contents of a cache file, or None
+
+    Same as load_code, for cache files that aren't read from the filesystem.
+    The mtimes can differ by up to `mtime_slack` seconds and still match.
+    """
+    if data is None or len(data) < _HEADER.size:
+        return None
+    magic, fmt, mtime, size, cached_fingerprint = _HEADER.unpack_from(data)
+    if (magic, fmt) != (MAGIC_NUMBER, _FORMAT):
+        return None
+    if (abs(mtime - stats['mtime']) > mtime_slack or size != stats['size']) and cached_fingerprint != fingerprint:
+        return None
+    try:
+        return marshal.loads(memoryview(data)[_HEADER.size:])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def store_code(path, flavor, stats, fingerprint, code, force=False):
+    """
+    Cache `code`, compiled from the notebook at `path` when it had `stats`
+
+    `fingerprint` is the notebook's, from ipynb.utils.fingerprint.
+    Failing to write the cache is never an error, same as for .py files.
+    Nothing is written if sys.dont_write_bytecode is set, unless `force` is.
+    """
+    if sys.dont_write_bytecode and not force:
+        return
+    cpath = cache_path(path, flavor)
+    if cpath is None:
+        return
+    header = _HEADER.pack(MAGIC_NUMBER, _FORMAT, stats['mtime'], stats['size'], fingerprint)
+    _write(cpath, header + marshal.dumps(code))
+
+
+def load_cells(path, flavor):
+    """
+    Return the cached code of the cells of the notebook at `path`
+
+    This is a dict mapping a hash of each cell's source to its code object.
+    It is empty if nothing was cached yet.
+    """
+    cpath = cache_path(path, flavor + '-cells')
+    return unpack_cells(_read(cpath) if cpath is not None else None)
+
+
+def unpack_cells(data):
+    """
+    Return the dict of cell code in `data`, the contents of a cells cache file
+    """
+    if data is None or data[:_CELLS_HEADER.size] != _CELLS_HEADER.pack(MAGIC_NUMBER, _FORMAT):
+        return {}
+    try:
+        cells = marshal.loads(memoryview(data)[_CELLS_HEADER.size:])
+    except (EOFError, ValueError, TypeError):
+        return {}
+    return cells if isinstance(cells, dict) else {}
+
+
+def store_cells(path, flavor, cells):
+    """
+    Cache the code of the cells of the notebook at `path`, as from load_cells
+    """
+    if sys.dont_write_bytecode:
+        return
+    cpath = cache_path(path, flavor + '-cells')
+    if cpath is None:
+        return
+    _write(cpath, _CELLS_HEADER.pack(MAGIC_NUMBER, _FORMAT) + marshal.dumps(cells))
+
+
+def _read(cpath):
+    """
+    Return the contents of the cache file at cpath, or None if it can't be read
+    """
+    try:
+        with open(cpath, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write(cpath, data):
+    """
+    Write data to the cache file at cpath, silently giving up on errors
+    """
+    try:
+        os.makedirs(os.path.dirname(cpath), exist_ok=True)
+        write_atomic(cpath, data)
+    except OSError:
+        pass
+
+
+def write_atomic(path, data):
+    """
+    Write data to path so that readers never see a partially written file
+    """
+    tmp_path = '{path}.{pid}.{thread}.tmp'.format(path=path, pid=os.getpid(), thread=threading.get_ident())
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
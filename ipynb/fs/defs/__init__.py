@@ -1,18 +1,34 @@
 """
 FileSystem based importer for ipynb / .py files that only imports function / class definitions.
 """
-import sys
 import ast
-import json
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
 
-from importlib.machinery import SourceFileLoader
-from ipynb.fs.finder import FSFinder
+from ipynb import config, instrument
+from ipynb.fs.finder import register
+from ipynb.fs.loader import NotebookLoader, importers
+from ipynb.fs.lazy import LazyDefinitions
+from ipynb.fs.prefetch import prefetch, imported_modules, package_of
 
-from ipynb.utils import code_from_ipynb, validate_nb, filter_ast
+from ipynb.utils import code_cells, filter_ast, maybe_has_definitions
 
 
+# path -> (size, {hash of cell source: [line offset, top level nodes kept]}),
+# for the cells as last imported, least recently used first. The nodes are
+# numbered as if the cell started at offset. size is the length of the sources
+# of the cells that were parsed.
+_filtered_cells = OrderedDict()
+# At most how long the sources of the cells kept in _filtered_cells get. Their
+# nodes take up about a hundred times as much memory.
+FILTERED_CACHE_SIZE = 1 << 16
+# Nodes are renumbered in place, so only one thread at a time can filter
+_filter_lock = threading.Lock()
 
-class FilteredLoader(SourceFileLoader):
+
+class FilteredLoader(NotebookLoader):
     """
     A notebook loader that loads only a subset of the code in an .ipynb file
 
@@ -22,31 +38,107 @@ class FilteredLoader(SourceFileLoader):
      - class definitions
      - top level assignments where all the targets on the LHS are all caps
 
+    Cells are filtered one by one, and the result is kept for each cell, so
+    only cells that changed since the last import are parsed again. Cells that
+    can't contain any of the items above aren't parsed at all.
+
+    With ipynb.config.lazy_defs set, nothing is executed at import time. Each
+    item is executed the first time it is accessed on the module instead, along
+    with the imports & other items it uses.
+
+    The notebook modules imported at the top level are loaded in the
+    background as soon as the notebook is filtered, see ipynb.fs.prefetch.
+
     If it isn't an .ipynb file, it's treated the same as a .py file.
     """
-    def get_code(self, fullname):
-        if self.path.endswith('.ipynb'):
-            with open(self.path) as f:
-                try:
-                    nb = json.load(f)
-                except ValueError:
-                    # This is if it isn't a valid JSON file at all
-                    raise ImportError('Could not import {path} for {fn}: not a valid ipynb file'.format(
-                        path=self.path,
-                        fn=fullname
-                    ))
-                if not validate_nb(nb):
-                    # This is when it isn't the appropriate
-                    # nbformet version or language
-                    raise ImportError('Could not import {path} for {fn}: incorrect version or language'.format(
-                        path=self.path,
-                        fn=fullname
-                    ))
-                return self.source_to_code(
-                    filter_ast(ast.parse(code_from_ipynb(nb))),
-                    self.path
-                )
+    flavor = 'defs'
+
+    def exec_module(self, module):
+        if config.lazy_defs and self.path.endswith('.ipynb'):
+            with self.executing(module):
+                nb = self.load_notebook(module.__name__)
+                body = self.filtered_body(nb)
+                LazyDefinitions(module, body, self.path).install()
+                # Nothing's imported yet, the imports will be
+                for name in imported_modules(body, package_of(self)):
+                    importers.setdefault(name, set()).add(module.__name__)
+        else:
+            super().exec_module(module)
+
+    def warm(self, fullname):
+        if config.lazy_defs and self.path.endswith('.ipynb'):
+            self.filtered_body(self.load_notebook(fullname))
         else:
-            return super().get_code(fullname)
+            super().warm(fullname)
+
+    def executes_whole_code(self):
+        return super().executes_whole_code() and not config.lazy_defs
+
+    def code_from_notebook(self, nb):
+        body = self.filtered_body(nb)
+        with instrument.phase(self.name, 'compile'):
+            return self.source_to_code(ast.Module(body=body, type_ignores=[]), self.path)
+
+    def filtered_body(self, nb):
+        """
+        Return the top level nodes of the notebook's code that are kept
+
+        The notebook modules they import start being prefetched.
+        """
+        with _filter_lock:
+            body = self._filtered_body(nb)
+        if config.prefetch:
+            prefetch(imported_modules(body, package_of(self)))
+        return body
+
+    def _filtered_body(self, nb):
+        _, previous = _filtered_cells.pop(self.path, (0, {}))
+        size = 0
+        filtered = {}
+        body = []
+        with instrument.phase(self.name, 'filter') as counts:
+            for offset, source in code_cells(nb):
+                digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+                if digest in filtered:
+                    # Same source as an earlier cell, whose nodes are in use
+                    nodes = copy.deepcopy(filtered[digest][1])
+                    cell_offset = filtered[digest][0]
+                else:
+                    if digest in previous:
+                        filtered[digest] = previous[digest]
+                    else:
+                        # Numbered right away, so they don't need moving
+                        filtered[digest] = [offset, self.filter_cell(source, offset)]
+                        counts['cells_parsed'] = counts.get('cells_parsed', 0) + 1
+                    cell_offset, nodes = filtered[digest]
+                    filtered[digest][0] = offset
+                    if nodes:
+                        size += len(source)
+                if offset != cell_offset:
+                    # Renumbering in place is a lot cheaper than copying
+                    for node in nodes:
+                        ast.increment_lineno(node, offset - cell_offset)
+                body.extend(nodes)
+            counts['nodes'] = len(body)
+        _filtered_cells[self.path] = (size, filtered)
+        total = sum(kept for kept, _ in _filtered_cells.values())
+        while total > FILTERED_CACHE_SIZE:
+            _, (evicted, _) = _filtered_cells.popitem(last=False)
+            total -= evicted
+        return body
+
+    def code_from_cell(self, source):
+        return self.source_to_code(ast.Module(body=self.filter_cell(source), type_ignores=[]), self.path)
+
+    def filter_cell(self, source, offset=0):
+        """
+        Return the top level nodes of a cell's source that filter_ast keeps
+
+        The nodes are numbered as if the cell started after offset lines.
+        """
+        if not maybe_has_definitions(source):
+            return []
+        # Blank lines are a lot cheaper to parse than renumbering the nodes
+        return filter_ast(ast.parse('\n' * offset + source, self.path)).body
 
-sys.meta_path.append(FSFinder(__package__, FilteredLoader))
+register(__package__, FilteredLoader)
@@ -1,51 +1,258 @@
 """
 Contains the finder for use with filesystems.
+
+A single finder is put on sys.meta_path, the first time a flavor of importer
+gets registered with `register`. It hands the modules under each registered
+package prefix to that flavor's loader.
+
+Bundles added with `add_bundle` are looked in before sys.path, see
+ipynb.fs.bundle.
 """
 import sys
 import os
+import zipfile
+import importlib
 
 from importlib.abc import MetaPathFinder
 from importlib.machinery import ModuleSpec
 
+from ipynb import instrument
+from ipynb.fs.zip import open_archive, split_entry, ZipLoaderMixin
+from ipynb.fs.bundle import Bundle, BundleLoaderMixin
+from ipynb.fs.loader import read_only_loader
+
 
 class FSFinder(MetaPathFinder):
     """
     Finder for ipynb/py files from the filesystem.
 
-    Only tries to load modules that are under ipynb.fs.
-    Tries to treat .ipynb and .py files exactly the same as much as possible.
+    Only tries to load modules that are under one of the registered package
+    prefixes, like ipynb.fs.full. Tries to treat .ipynb and .py files exactly
+    the same as much as possible, including in zip archives on sys.path.
 
-    The loader_class passed in to the constructor is used to do actual loading
+    The loader_class registered for the prefix is used to do actual loading.
+    Passing a package_prefix and loader_class to the constructor registers them.
     """
-    def __init__(self, package_prefix, loader_class):
-        self.loader_class = loader_class
-        self.package_prefix = package_prefix
+    def __init__(self, package_prefix=None, loader_class=None):
+        # package prefix -> loader class
+        self.flavors = {}
+        # first component of each package prefix, to turn other modules down quickly
+        self._roots = frozenset()
+        # directory -> (mtime, names of the entries in it)
+        self._path_cache = {}
+        # module name -> path it's known to be at, see seed
+        self._known = {}
+        # Bundles to look in before sys.path, in order
+        self.bundles = []
+        if package_prefix is not None:
+            self.register(package_prefix, loader_class)
 
-    def _get_paths(self, fullname):
+    def register(self, package_prefix, loader_class):
+        """
+        Have the modules under package_prefix loaded by loader_class
         """
-        Generate ordered list of paths we should look for fullname module in
+        self.flavors[package_prefix] = loader_class
+        self._roots = frozenset(prefix.partition('.')[0] for prefix in self.flavors)
+
+    def seed(self, fullname, path):
+        """
+        Have fullname found at path without looking through sys.path
+
+        That is as long as there's a file at path. It's meant for paths that
+        were found earlier, like the ones recorded by ipynb.manifest.
+        """
+        self._known[fullname] = path
+
+    def add_bundle(self, path):
+        """
+        Find the modules in the bundle at path, before any on sys.path
+
+        Raises ValueError if it isn't a bundle. Returns the Bundle.
+        """
+        bundle = Bundle(path)
+        self.bundles.append(bundle)
+        return bundle
+
+    def invalidate_caches(self):
         """
-        real_path = os.path.join(*fullname[len(self.package_prefix):].split('.'))
+        Forget all the directory listings we've cached
+        """
+        self._path_cache.clear()
+        split_entry.cache_clear()
+
+    def _listdir(self, directory, counts):
+        """
+        Return the set of entries in directory, cached until it is modified
+
+        Returns an empty set if directory doesn't exist or isn't a directory.
+        counts is a dict of instrument counts to add the calls made to.
+        """
+        counts['stats'] = counts.get('stats', 0) + 1
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return frozenset()
+        cached = self._path_cache.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        counts['listdirs'] = counts.get('listdirs', 0) + 1
+        try:
+            contents = frozenset(os.listdir(directory))
+        except OSError:
+            contents = frozenset()
+        self._path_cache[directory] = (mtime, contents)
+        return contents
+
+    def _flavor(self, fullname):
+        """
+        Return (package prefix, loader class) for fullname, or (None, None)
+        """
+        parts = fullname.split('.')
+        for i in range(len(parts) - 1, 0, -1):
+            prefix = '.'.join(parts[:i])
+            if prefix in self.flavors:
+                return prefix, self.flavors[prefix]
+        return None, None
+
+    def _find_path(self, name, counts):
+        """
+        Return (path, archive) for the file module name should be loaded from
+
+        name is relative to the package prefix. Looks in each of sys.path, in
+        order, for:
+         - name.ipynb
+         - name.py
+         - name/__init__.ipynb
+         - name/__init__.py
+
+        archive is None unless the file is in a zip archive. Returns None if
+        there's no such file. counts is a dict of instrument counts to add the
+        paths probed to.
+        """
+        parts = name.split('.')
+        real_path, name = os.path.join(*parts[:-1]) if len(parts) > 1 else '', parts[-1]
         for base_path in sys.path:
+            counts['paths'] = counts.get('paths', 0) + 1
             if base_path == '':
                 # Empty string means process's cwd
                 base_path = os.getcwd()
-            path = os.path.join(base_path, real_path)
-            yield path + '.ipynb'
-            yield path + '.py'
-            yield os.path.join(path, '__init__.ipynb')
-            yield os.path.join(path, '__init__.py')
+            else:
+                entry = split_entry(base_path)
+                if entry is not None:
+                    found = self._find_in_archive(entry, parts)
+                    if found is not None:
+                        return found
+                    continue
+            directory = os.path.join(base_path, real_path) if real_path else base_path
+            contents = self._listdir(directory, counts)
+            for filename in (name + '.ipynb', name + '.py'):
+                if filename in contents:
+                    return os.path.join(directory, filename), None
+            if name in contents:
+                package = os.path.join(directory, name)
+                package_contents = self._listdir(package, counts)
+                for filename in ('__init__.ipynb', '__init__.py'):
+                    if filename in package_contents:
+                        return os.path.join(package, filename), None
+        return None
+
+    def _find_in_bundles(self, name):
+        """
+        Same as _find_path, in the bundles, returning (path, bundle) or None
+        """
+        for bundle in self.bundles:
+            entry = bundle.modules.get(name)
+            if entry is not None:
+                return bundle.origin(entry), bundle
+        return None
+
+    def _find_in_archive(self, entry, parts):
+        """
+        Same as _find_path, in the archive for a sys.path entry from split_entry
+        """
+        archive_path, inner = entry
+        try:
+            archive = open_archive(archive_path)
+        except (OSError, zipfile.BadZipFile):
+            return None
+        directory = '/'.join(p for p in [inner] + parts[:-1] if p)
+        name = parts[-1]
+        for filename in (name + '.ipynb', name + '.py', name + '/__init__.ipynb', name + '/__init__.py'):
+            member = directory + '/' + filename if directory else filename
+            if member in archive.infos:
+                return os.path.join(archive.path, *member.split('/')), archive
+        return None
 
     def find_spec(self, fullname, path, target=None):
         """
-        Claims modules that are under ipynb.fs
-        """
-        if fullname.startswith(self.package_prefix):
-            for path in self._get_paths(fullname):
-                if os.path.exists(path):
-                    return ModuleSpec(
-                        name=fullname,
-                        loader=self.loader_class(fullname, path),
-                        origin=path,
-                        is_package=(path.endswith('__init__.ipynb') or path.endswith('__init__.py')),
-                    )
+        Claims modules that are under the registered package prefixes
+        """
+        if fullname.partition('.')[0] not in self._roots:
+            return None
+        prefix, loader_class = self._flavor(fullname)
+        if loader_class is None:
+            return None
+        name = fullname[len(prefix) + 1:]
+        with instrument.phase(fullname, 'find') as counts:
+            known = self._known.get(fullname)
+            if known is not None and os.path.isfile(known):
+                found = known, None
+            else:
+                found = self._find_in_bundles(name)
+                if found is None:
+                    found = self._find_path(name, counts)
+        if found is None:
+            return None
+        path, container = found
+        if container is None:
+            loader = loader_class(fullname, path)
+        elif isinstance(container, Bundle):
+            loader = read_only_loader(BundleLoaderMixin, loader_class)(fullname, path, container)
+        else:
+            loader = read_only_loader(ZipLoaderMixin, loader_class)(fullname, path, container)
+        return ModuleSpec(
+            name=fullname,
+            loader=loader,
+            origin=path,
+            is_package=(path.endswith('__init__.ipynb') or path.endswith('__init__.py')),
+        )
+
+
+# The finder shared by all the flavors
+finder = FSFinder()
+
+
+def register(package_prefix, loader_class):
+    """
+    Have the modules under package_prefix imported with loader_class
+
+    This is how each flavor of ipynb.fs plugs itself in. The shared finder is
+    added to sys.meta_path the first time, and only then.
+    """
+    finder.register(package_prefix, loader_class)
+    if finder not in sys.meta_path:
+        sys.meta_path.append(finder)
+
+
+def add_bundle(path):
+    """
+    Have modules found in the bundle at path first, see ipynb.fs.bundle
+    """
+    return finder.add_bundle(path)
+
+
+def find_spec(fullname):
+    """
+    Return the spec for a module under one of the flavors' prefixes, or None
+
+    The packages above the flavor's prefix, like ipynb.fs.full, are imported
+    so that the flavor gets registered, but not the packages between the
+    prefix and the module. Nothing from a notebook gets executed.
+    """
+    parts = fullname.split('.')
+    for i in range(1, len(parts)):
+        name = '.'.join(parts[:i])
+        if name not in sys.modules and finder.find_spec(name, None) is not None:
+            break
+        importlib.import_module(name)
+    return finder.find_spec(fullname, None)
@@ -0,0 +1,66 @@
+"""
+Coordination between threads importing the same notebooks at the same time.
+
+The import system already makes sure only one thread imports a given module
+at a time. But the same notebook is read for each of the ipynb.fs flavors,
+and code can be loaded outside of an import, like when reloading. Instead of
+doing the same work side by side, threads wait for the one already doing it.
+"""
+import threading
+
+
+class _Call:
+    """
+    A piece of work being done by one thread, that others can wait for
+    """
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.done = threading.Event()
+        self.failed = False
+        self.result = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call at a time for a given key
+
+    Threads asking for a key that's already being worked on wait for that
+    call to finish and get its result. If it failed, they try again on their
+    own, so that each gets its own exception.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> _Call in flight
+        self._calls = {}
+
+    def do(self, key, function, *args):
+        """
+        Return function(*args), or the result of the same call in flight
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    break
+            if call.thread == threading.get_ident():
+                # Asked again while doing it, waiting would deadlock
+                return function(*args)
+            call.done.wait()
+            if not call.failed:
+                return call.result
+
+        try:
+            call.result = function(*args)
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+# Shared by all the loaders
+flights = SingleFlight()
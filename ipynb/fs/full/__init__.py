@@ -5,44 +5,53 @@ If you prefix module names with 'ipynb.fs', it'll try to treat them exactly
 the same way as .py files. All the output is ignored, and all the code is imported
 as if the cells were linearly written to be in a flat file.
 """
-import sys
-import json
-from importlib.machinery import SourceFileLoader
 
-from ipynb.utils import code_from_ipynb, validate_nb
-from ipynb.fs.finder import FSFinder
+from ipynb import config, instrument
+from ipynb.utils import code_from_ipynb, code_cells
+from ipynb.fs.finder import register
+from ipynb.fs.loader import NotebookLoader
+from ipynb.fs.prefetch import prefetch, imported_modules_of_cells, package_of
+from ipynb.fs import memo
 
 
-class FullLoader(SourceFileLoader):
+class FullLoader(NotebookLoader):
     """
     A notebook loader that loads code from a .ipynb file
 
     It picks out all the code from a .ipynb file and executes it
     into the module.
 
+    The notebook modules it imports are loaded in the background while it's
+    compiled, see ipynb.fs.prefetch.
+
+    With ipynb.config.memoize_cells set, what the cells compute is restored
+    from a cache when they didn't change, see ipynb.fs.memo.
+
     If it isn't an .ipnb file, it's treated the same as a .py file
     """
-    def get_code(self, fullname):
-        if self.path.endswith('.ipynb'):
-            with open(self.path) as f:
-                try:
-                    nb = json.load(f)
-                except ValueError:
-                    # This is when it isn't a valid json file
-                    raise ImportError('Could not import {path} for {fn}: not a valid ipynb file'.format(
-                        path=self.path,
-                        fn=fullname
-                    ))
-                if not validate_nb(nb):
-                    # This is when it isn't the appropriate
-                    # nbformet version or language
-                    raise ImportError('Could not import {path} for {fn}: incorrect version or language'.format(
-                        path=self.path,
-                        fn=fullname
-                    ))
-                return self.source_to_code(code_from_ipynb(nb), self.path)
+    flavor = 'full'
+
+    def exec_module(self, module):
+        if config.memoize_cells and self.path.endswith('.ipynb'):
+            with self.executing(module):
+                memo.exec_memoized(self, module)
         else:
-            return super().get_code(fullname)
+            super().exec_module(module)
+
+    def executes_whole_code(self):
+        return super().executes_whole_code() and not config.memoize_cells
+
+    def code_from_notebook(self, nb):
+        if config.prefetch:
+            prefetch(imported_modules_of_cells((source for _, source in code_cells(nb)), package_of(self)))
+        with instrument.phase(self.name, 'assemble') as counts:
+            source = code_from_ipynb(nb)
+            counts['bytes'] = len(source)
+        with instrument.phase(self.name, 'compile'):
+            return self.source_to_code(source, self.path)
+
+    def code_from_cell(self, source):
+        return self.source_to_code(source, self.path)
 
 
-sys.meta_path.append(FSFinder(__package__, FullLoader))
+register(__package__, FullLoader)
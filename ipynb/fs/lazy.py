@@ -0,0 +1,143 @@
+"""
+Lazily executed module attributes, for definitions only imports.
+
+Every top level item kept in a definitions only import binds a few names:
+functions & classes their name, imports the name of the module or object
+imported, and ALL_CAPS assignments their targets. The module gets a
+__getattr__ (PEP 562) that executes the items binding a name the first time
+it is accessed. Everything those items refer to is executed along with them,
+so that imports of heavy libraries only happen when something needs them.
+"""
+import ast
+import threading
+
+
+def bound_names(node):
+    """
+    Return the names a top level node binds, or None if they can't be known
+    """
+    if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        names = []
+        for alias in node.names:
+            if alias.name == '*':
+                return None
+            if alias.asname is not None:
+                names.append(alias.asname)
+            elif isinstance(node, ast.Import):
+                # import a.b binds a
+                names.append(alias.name.partition('.')[0])
+            else:
+                names.append(alias.name)
+        return names
+    if isinstance(node, ast.Assign):
+        return [t.id for t in node.targets]
+    return None
+
+
+def used_names(node):
+    """
+    Return all the names referred to anywhere in node
+    """
+    return set(n.id for n in ast.walk(node) if isinstance(n, ast.Name))
+
+
+class LazyDefinitions:
+    """
+    The lazily executed top level items of a module
+
+    Each item is executed once, even when threads access the module at the
+    same time: the other threads wait for the items to be executed.
+    """
+    def __init__(self, module, nodes, path):
+        self.module = module
+        self.nodes = nodes
+        self.path = path
+        # name -> indexes of the nodes binding it, in order
+        self.bindings = {}
+        # name -> indexes of the nodes referring to it, in order
+        self.users = {}
+        # nodes that have to be executed right away
+        self.eager = []
+        self.executed = set()
+        # Reentrant, executing a node can access the module's other names
+        self._lock = threading.RLock()
+        for i, node in enumerate(nodes):
+            for name in used_names(node):
+                self.users.setdefault(name, []).append(i)
+            names = bound_names(node)
+            if names is None:
+                self.eager.append(i)
+                continue
+            for name in names:
+                self.bindings.setdefault(name, []).append(i)
+
+    def install(self):
+        """
+        Set up the module's __getattr__ & __dir__, and execute the eager nodes
+
+        When the module is reloaded, the values executed from its previous
+        code are dropped, so that __getattr__ gets to execute the new nodes.
+        """
+        namespace = self.module.__dict__
+        for name in self.bindings:
+            namespace.pop(name, None)
+        namespace['__getattr__'] = self.getattr
+        namespace['__dir__'] = self.dir
+        self._execute(self.eager)
+        # Same names as `from module import *` would get if nothing was lazy
+        namespace['__all__'] = sorted(
+            name for name in set(namespace) | set(self.bindings)
+            if not name.startswith('_')
+        )
+
+    def getattr(self, name):
+        """
+        Module __getattr__, executing the nodes needed to get name
+        """
+        if name in self.bindings:
+            with self._lock:
+                self._execute(self._needed(name))
+            if name in self.module.__dict__:
+                return self.module.__dict__[name]
+        raise AttributeError('module {mod!r} has no attribute {name!r}'.format(
+            mod=self.module.__name__,
+            name=name
+        ))
+
+    def dir(self):
+        """
+        Module __dir__, listing names that haven't been executed yet too
+        """
+        return sorted(set(self.module.__dict__) | set(self.bindings))
+
+    def _needed(self, name):
+        """
+        Return the indexes of the nodes to execute to get name, in order
+
+        That's all the nodes binding name, everything they use and so on.
+        Nodes binding more than one name pull in the other nodes binding
+        those names too. The earlier nodes using a name a node binds again
+        are executed along with it, before it, while they can still see the
+        name's earlier value. So the end result doesn't depend on access order.
+        """
+        needed = set()
+        todo = list(self.bindings.get(name, ()))
+        while todo:
+            i = todo.pop()
+            if i in needed or i in self.executed:
+                continue
+            needed.add(i)
+            for bound in bound_names(self.nodes[i]):
+                todo.extend(self.bindings.get(bound, ()))
+                todo.extend(j for j in self.users.get(bound, ()) if j < i)
+            for used in used_names(self.nodes[i]):
+                todo.extend(self.bindings.get(used, ()))
+        return sorted(needed)
+
+    def _execute(self, indexes):
+        for i in indexes:
+            code = compile(ast.Module(body=[self.nodes[i]], type_ignores=[]), self.path, 'exec')
+            exec(code, self.module.__dict__)
+            self.executed.add(i)
@@ -0,0 +1,480 @@
+"""
+Base loader shared by the different flavors of notebook importers.
+"""
+import os
+import sys
+import dis
+import mmap
+import hashlib
+import threading
+import warnings
+import functools
+import contextlib
+from types import CodeType
+from importlib.util import resolve_name
+from importlib.machinery import SourceFileLoader
+
+from ipynb import config, instrument, profile
+from ipynb.fs import cache
+from ipynb.fs.flight import flights
+from ipynb.utils import validate_nb, code_cells, fingerprint
+from ipynb.reader import read_notebook, parse_cache, SMALL_NOTEBOOK
+
+# (path, flavor) -> {hash of cell source: code}, for the cells as last imported
+_cell_codes = {}
+# (path, flavor) -> (stats, code), for the code loaded ahead of an import, until
+# the import uses it
+_codes = {}
+# module name -> names of the notebook modules that import it, i.e. the
+# modules that depend on it
+importers = {}
+# (module name, path, flavor) of each notebook module executed, in order,
+# while ipynb.manifest is recording. None when it isn't.
+recording = None
+_local = threading.local()
+_IMPORT_NAME = dis.opmap['IMPORT_NAME']
+# Instructions that can load the level & fromlist of an import
+_CONSTANT_LOADS = ('LOAD_CONST', 'LOAD_SMALL_INT')
+_LOAD_CONST = dis.opmap['LOAD_CONST']
+_EXTENDED_ARG = dis.opmap['EXTENDED_ARG']
+
+
+class NotebookLoader(SourceFileLoader):
+    """
+    Base class for loaders that turn an .ipynb file into a module
+
+    Subclasses set `flavor`, which keeps their cached code apart from the
+    other flavors', and implement `code_from_notebook` and `code_from_cell`.
+
+    Compiled code is cached on disk, so a notebook that hasn't changed isn't
+    parsed nor compiled again on the next import.
+
+    With ipynb.config.per_cell set, each code cell is compiled and cached on
+    its own instead, and the cells are executed one after the other in the
+    module's namespace. Only the cells that changed get recompiled. That's
+    also how notebooks are executed while ipynb.profile is enabled.
+
+    When threads load the same notebook at the same time, only one of them
+    reads, parses & compiles it, and the others wait for its result.
+
+    If it isn't an .ipynb file, it's treated the same as a .py file.
+    """
+    flavor = None
+
+    def code_from_notebook(self, nb):
+        """
+        Return the code object for the given parsed notebook
+        """
+        raise NotImplementedError
+
+    def code_from_cell(self, source):
+        """
+        Return the code object for the source of a single code cell
+
+        Its line numbers start at the cell's first line.
+        """
+        raise NotImplementedError
+
+    def exec_module(self, module):
+        with self.executing(module):
+            if not self.path.endswith('.ipynb'):
+                with instrument.phase(module.__name__, 'exec'):
+                    super().exec_module(module)
+                return
+
+            if profile.is_enabled():
+                self.exec_profiled(module)
+                return
+
+            if config.per_cell:
+                codes = self.get_cell_codes(module.__name__)
+            else:
+                codes = [self.get_code(module.__name__)]
+            with instrument.phase(module.__name__, 'exec'):
+                for code in codes:
+                    exec(code, module.__dict__)
+            record_imports(module, codes)
+
+    def exec_profiled(self, module):
+        """
+        Execute the module's cells one by one, recording each, see ipynb.profile
+        """
+        codes = self.get_cell_codes(module.__name__)
+        nb = self.load_notebook(module.__name__)
+        cells = [(index, cell) for index, cell in enumerate(nb['cells']) if cell['cell_type'] == 'code']
+        with instrument.phase(module.__name__, 'exec'):
+            for (index, cell), code in zip(cells, codes):
+                with profile.cell(module.__name__, index, cell.get('id'), ''.join(cell['source'])):
+                    exec(code, module.__dict__)
+        record_imports(module, codes)
+
+    @contextlib.contextmanager
+    def executing(self, module):
+        """
+        Record the module as a dependent of the modules imported in the block
+
+        Only the modules executed in the block are seen, see record_imports
+        for the others. Also records the module as imported, if
+        ipynb.manifest is recording.
+        """
+        if not hasattr(_local, 'stack'):
+            _local.stack = []
+        if _local.stack:
+            importers.setdefault(module.__name__, set()).add(_local.stack[-1])
+        if recording is not None:
+            recording.append((module.__name__, self.path, self.flavor))
+        _local.stack.append(module.__name__)
+        try:
+            yield
+        finally:
+            _local.stack.pop()
+
+    def get_cell_codes(self, fullname):
+        """
+        Return the list of code objects for each code cell, in order
+        """
+        return flights.do(('cells', self.flavor, self.path), self._get_cell_codes, fullname)
+
+    def _get_cell_codes(self, fullname):
+        key = (self.path, self.flavor)
+        cached = _cell_codes.get(key)
+        if cached is None:
+            cached = self.load_cached_cells()
+
+        # Cells are compiled with their own line numbers, so they don't need
+        # compiling again when cells above them change, and are shifted to the
+        # notebook's line numbers afterwards
+        codes = {}
+        cells = []
+        for offset, source in code_cells(self.load_notebook(fullname)):
+            digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+            if digest not in codes:
+                codes[digest] = cached[digest] if digest in cached else self._compile_cell(source, offset)
+            cells.append((offset, digest))
+
+        if codes.keys() != cached.keys():
+            self.store_cached_cells(codes)
+        _cell_codes[key] = codes
+        return [shift_lines(codes[digest], offset) for offset, digest in cells]
+
+    def _compile_cell(self, source, offset):
+        try:
+            return self.code_from_cell(source)
+        except SyntaxError as e:
+            if e.lineno is not None:
+                e.lineno += offset
+            if getattr(e, 'end_lineno', None) is not None:
+                e.end_lineno += offset
+            raise
+
+    def get_code(self, fullname):
+        if not self.path.endswith('.ipynb'):
+            return super().get_code(fullname)
+        # Only one thread loads or compiles the code, the others wait for it
+        return flights.do(('code', self.flavor, self.path), self._get_code, fullname)
+
+    def _get_code(self, fullname):
+        with instrument.phase(fullname, 'cache') as counts:
+            stats = self.path_stats(self.path)
+            loaded = _codes.pop((self.path, self.flavor), None)
+            code = loaded[1] if loaded is not None and loaded[0] == stats else None
+            if code is None:
+                code = self.load_cached_code(stats)
+            counts['hits'] = int(code is not None)
+        if code is None:
+            nb = self.load_notebook(fullname)
+            nb_fingerprint = fingerprint(nb)
+            with instrument.phase(fullname, 'cache') as counts:
+                # The notebook might only have been re-run, changing nothing
+                # but outputs. Then the code is the same & only stats change.
+                code = self.load_cached_code(stats, nb_fingerprint)
+                counts['fingerprint_hits'] = int(code is not None)
+            if code is None:
+                code = self.code_from_notebook(nb)
+            with instrument.phase(fullname, 'cache'):
+                self.store_cached_code(stats, nb_fingerprint, code)
+        return code
+
+    def warm(self, fullname):
+        """
+        Do all the work exec_module will have to short of executing anything
+
+        That's reading, parsing & compiling the notebook, the result of which
+        is kept for exec_module. Unlike exec_module, it can be done from any
+        thread, ahead of the import.
+        """
+        if not self.path.endswith('.ipynb'):
+            return
+        if self.executes_whole_code():
+            # Taken before reading, so a change meanwhile isn't missed
+            stats = self.path_stats(self.path)
+            remember_code(self.path, self.flavor, stats, self.get_code(fullname))
+        else:
+            self.get_cell_codes(fullname)
+
+    def executes_whole_code(self):
+        """
+        Return whether exec_module executes get_code's code, rather than the cells'
+        """
+        return not (config.per_cell or profile.is_enabled())
+
+    def load_cached_code(self, stats, nb_fingerprint=None):
+        """
+        Return the cached code for the notebook, or None, see cache.load_code
+        """
+        return cache.load_code(self.path, self.flavor, stats, nb_fingerprint)
+
+    def store_cached_code(self, stats, nb_fingerprint, code):
+        """
+        Cache the code compiled from the notebook, see cache.store_code
+        """
+        cache.store_code(self.path, self.flavor, stats, nb_fingerprint, code)
+
+    def load_cached_cells(self):
+        """
+        Return the cached code of the notebook's cells, see cache.load_cells
+        """
+        return cache.load_cells(self.path, self.flavor)
+
+    def store_cached_cells(self, cells):
+        """
+        Cache the code of the notebook's cells, see cache.store_cells
+        """
+        cache.store_cells(self.path, self.flavor, cells)
+
+    def read_notebook(self, fullname):
+        """
+        Read the notebook, raising ImportError if it isn't valid JSON
+        """
+        with contextlib.ExitStack() as stack:
+            with instrument.phase(fullname, 'read') as counts:
+                data = stack.enter_context(self.notebook_data())
+                counts['bytes'] = len(data)
+            try:
+                with instrument.phase(fullname, 'parse') as counts:
+                    nb = read_notebook(data)
+                    counts['cells'] = len(nb.get('cells', ()))
+            except ValueError:
+                # This is when it isn't a valid json file
+                raise ImportError('Could not import {path} for {fn}: not a valid ipynb file'.format(
+                    path=self.path,
+                    fn=fullname
+                ))
+        return nb
+
+    def _read_and_cache(self, fullname, stats):
+        # Another thread might have just put it there
+        nb = parse_cache.get(self.path, stats)
+        if nb is None:
+            nb = self.read_notebook(fullname)
+            parse_cache.put(self.path, stats, nb)
+        return nb
+
+    @contextlib.contextmanager
+    def notebook_data(self):
+        """
+        Give the raw bytes of the notebook, as a bytes-like object
+
+        Big notebooks are memory-mapped rather than read, so the outputs the
+        reader skips over are never copied into memory.
+        """
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size <= SMALL_NOTEBOOK:
+                # The reader decodes small notebooks whole anyway
+                yield f.read()
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+
+    def load_notebook(self, fullname):
+        """
+        Read & validate the notebook, raising ImportError if it can't be imported
+
+        Only the cells from select_cells are in it. It can be shared with the
+        other loaders through the reader's parse_cache, it mustn't be modified.
+        """
+        stats = self.path_stats(self.path)
+        with instrument.phase(fullname, 'parse') as counts:
+            nb = parse_cache.get(self.path, stats)
+            counts['cache_hits'] = int(nb is not None)
+        if nb is None:
+            nb = flights.do(('parse', self.path), self._read_and_cache, fullname, stats)
+        if not validate_nb(nb):
+            # This is when it isn't the appropriate
+            # nbformet version or language
+            raise ImportError('Could not import {path} for {fn}: incorrect version or language'.format(
+                path=self.path,
+                fn=fullname
+            ))
+        return self.select_cells(nb)
+
+    def select_cells(self, nb):
+        """
+        Return the notebook with only the cells the loader imports, all by default
+
+        nb mustn't be modified, a notebook with other cells is returned instead.
+        """
+        return nb
+
+
+class ReadOnlyLoaderMixin:
+    """
+    Base for mixins of NotebookLoader classes, loading modules from a container
+    like a zip archive, that's never written to
+
+    Subclasses set `kind`, which prefixes the names of the loader classes, and
+    implement `get_data`, `path_stats`, `load_cached_code` and `load_cached_cells`
+    by looking in the container.
+    """
+    kind = None
+
+    def __init__(self, fullname, path, container):
+        super().__init__(fullname, path)
+        self.container = container
+
+    @contextlib.contextmanager
+    def notebook_data(self):
+        """
+        Give the raw bytes of the notebook, read from the container
+        """
+        yield self.get_data(self.path)
+
+    def set_data(self, path, data, *, _mode=0o666):
+        """
+        Write nothing, containers are read only & .py files get compiled on each import
+        """
+
+    def store_cached_code(self, stats, nb_fingerprint, code):
+        """
+        Cache nothing, containers are read only
+        """
+
+    def store_cached_cells(self, cells):
+        """
+        Cache nothing, containers are read only
+        """
+
+
+@functools.lru_cache(maxsize=None)
+def read_only_loader(mixin, loader_class):
+    """
+    Return a loader class that loads what loader_class does with mixin, a ReadOnlyLoaderMixin
+    """
+    return type(mixin.kind + loader_class.__name__, (mixin, loader_class), {})
+
+
+def imported_names(code, package):
+    """
+    Return the names of the modules imported by code's top level, in order
+
+    package is the one relative imports are from. `from module import name`
+    lists module.name as well, in case it's a module.
+    """
+    # Going through dis takes a lot longer than executing the code, so the
+    # imports are picked out of the bytecode: each is the level & fromlist
+    # constants, then IMPORT_NAME. Python versions that compile them some
+    # other way go through dis after all.
+    co_code = code.co_code
+    names = []
+    position = co_code.find(_IMPORT_NAME)
+    while position != -1:
+        if position % 2 == 0:
+            start, index = _instruction(co_code, position)
+            start, fromlist = _instruction(co_code, start - 2, _LOAD_CONST)
+            start, level = _instruction(co_code, start - 2, _LOAD_CONST)
+            if level is None or fromlist is None:
+                return _disassembled_imported_names(code, package)
+            _add_import(names, code.co_names[index], code.co_consts[level], code.co_consts[fromlist], package)
+        position = co_code.find(_IMPORT_NAME, position + 1)
+    return names
+
+
+def _disassembled_imported_names(code, package):
+    """
+    Return the same as imported_names, slowly, but from more kinds of bytecode
+
+    Warns if an import still can't be made sense of.
+    """
+    names = []
+    constants = []
+    for instruction in dis.get_instructions(code):
+        if instruction.opname == 'EXTENDED_ARG':
+            continue
+        if instruction.opname == 'IMPORT_NAME':
+            if len(constants) < 2:
+                warnings.warn('Could not tell which module {filename} imports on python {version}'.format(
+                    filename=code.co_filename,
+                    version=sys.version.split()[0]
+                ), RuntimeWarning)
+            else:
+                _add_import(names, instruction.argval, constants[-2], constants[-1], package)
+        if instruction.opname in _CONSTANT_LOADS:
+            constants.append(instruction.argval)
+        else:
+            constants = []
+    return names
+
+
+def _instruction(co_code, position, opcode=None):
+    """
+    Return (start, argument) of the instruction at position
+
+    start is where its EXTENDED_ARG prefixes start. The argument is None if
+    the instruction isn't opcode.
+    """
+    if position < 0 or (opcode is not None and co_code[position] != opcode):
+        return position, None
+    arg = co_code[position + 1]
+    shift = 8
+    while position >= 2 and co_code[position - 2] == _EXTENDED_ARG:
+        position -= 2
+        arg |= co_code[position + 1] << shift
+        shift += 8
+    return position, arg
+
+
+def _add_import(names, name, level, fromlist, package):
+    if level:
+        try:
+            name = resolve_name('.' * level + name, package)
+        except (ImportError, ValueError):
+            return
+    names.append(name)
+    names.extend(name + '.' + alias for alias in fromlist or () if alias != '*')
+
+
+def record_imports(module, codes):
+    """
+    Record the module as a dependent of the notebook modules its codes import
+
+    Unlike NotebookLoader.executing, that includes the modules that had
+    already been imported before.
+    """
+    for code in codes:
+        for name in imported_names(code, module.__package__):
+            spec = getattr(sys.modules.get(name), '__spec__', None)
+            if name != module.__name__ and isinstance(getattr(spec, 'loader', None), NotebookLoader):
+                importers.setdefault(name, set()).add(module.__name__)
+
+
+def shift_lines(code, offset):
+    """
+    Return code with its line numbers, and its nested code's, moved down by offset
+    """
+    if not offset:
+        return code
+    consts = tuple(
+        shift_lines(const, offset) if isinstance(const, CodeType) else const
+        for const in code.co_consts
+    )
+    return code.replace(co_firstlineno=code.co_firstlineno + offset, co_consts=consts)
+
+
+def remember_code(path, flavor, stats, code):
+    """
+    Keep the code loaded for the notebook at path when it had stats
+
+    The next import of the notebook as flavor uses it, unless the notebook
+    changed since.
+    """
+    _codes[(path, flavor)] = (stats, code)
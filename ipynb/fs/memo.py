@@ -0,0 +1,303 @@
+"""
+Persistent memoization of what the cells of ipynb.fs.full notebooks compute.
+
+```
+import ipynb.config
+ipynb.config.memoize_cells = True
+
+import ipynb.fs.full.analysis  # executes the cells, keeping their results
+import ipynb.fs.full.analysis  # in another process, restores them
+```
+
+After each cell runs, the names it assigns, and the other names of the module
+it refers to, are pickled into a cache directory. The next time the notebook is
+imported, a cell whose source, and whose earlier cells' sources, are the same
+gets its names restored from there instead of being executed. So do the
+notebooks it imports, through their fingerprints, and the notebooks they import
+in turn. That includes the ones imported inside the functions it calls, and the
+ones imported for the first time while it ran.
+
+Cells that assign a name that can't be pickled are always executed, as are the
+cells that define functions or classes, which are cheap to execute anyway. To
+get the most out of it, keep the expensive cells apart from the definitions.
+Modules are pickled as references, and imported again when restored.
+
+It's only correct for cells that compute the same thing every time from their
+sources: cells reading files that change, the time, random numbers, or changing
+objects they don't refer to by name should be kept out of notebooks imported
+this way. Objects shared between names are restored as copies. The cache is
+trusted: anything that can write to it can run code in the importing process.
+
+The cache is kept in ipynb.config.memo_dir, and the entries least recently
+used are removed when it grows over ipynb.config.memo_max_size bytes.
+"""
+import io
+import os
+import sys
+import types
+import pickle
+import hashlib
+import threading
+import importlib
+from importlib.util import MAGIC_NUMBER
+
+from ipynb import config, instrument, profile
+from ipynb.fs import cache
+from ipynb.fs.loader import importers, imported_names, record_imports
+from ipynb.reader import read_notebook_file
+from ipynb.utils import fingerprint
+
+_lock = threading.Lock()
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickler that stores modules as references, imported again on load
+    """
+    def reducer_override(self, obj):
+        """
+        Reduce modules to importing them by name, everything else as usual
+        """
+        if isinstance(obj, types.ModuleType):
+            return importlib.import_module, (obj.__name__,)
+        return NotImplemented
+
+
+def memo_dir():
+    """
+    Return the directory the cache is kept in
+    """
+    if config.memo_dir is not None:
+        return config.memo_dir
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ipynb', 'cells')
+
+
+def _entry_path(key):
+    return os.path.join(memo_dir(), key + '.pickle')
+
+
+def _dumps(obj):
+    f = io.BytesIO()
+    _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return f.getvalue()
+
+
+def _dumps_or_none(value):
+    try:
+        return _dumps(value)
+    except (pickle.PicklingError, TypeError, AttributeError, ValueError):
+        return None
+
+
+def notebook_fingerprints(names):
+    """
+    Return sorted (name, fingerprint) of the notebook modules in names
+
+    The notebook modules they import are included, recursively. The
+    fingerprint is None when the module's notebook can't be read.
+    """
+    seen = {}
+    todo = [name for name in names if _is_notebook(name)]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        try:
+            seen[name] = fingerprint(read_notebook_file(sys.modules[name].__spec__.origin))
+        except (OSError, ValueError, KeyError):
+            seen[name] = None
+        todo.extend(child for child, parents in list(importers.items()) if name in parents and _is_notebook(child))
+    return sorted(seen.items())
+
+
+def _is_notebook(name):
+    origin = getattr(getattr(sys.modules.get(name), '__spec__', None), 'origin', None)
+    return origin is not None and origin.endswith('.ipynb')
+
+
+def _names_used(code):
+    """
+    Return the global names code & the code nested in it refer to
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _names_used(const)
+    return names
+
+
+def load(key):
+    """
+    Return the names stored for key, or None if there's nothing usable
+
+    The notebooks the cell imported are imported again, and it's a miss if
+    they changed since. Returns (names, notebook_fingerprints of those
+    notebooks) on a hit.
+    """
+    try:
+        with open(_entry_path(key), 'rb') as f:
+            data = f.read()
+        deps, imported, payload = pickle.loads(data)
+        for name in imported:
+            importlib.import_module(name)
+        if notebook_fingerprints(imported) != deps:
+            return None
+        names = {name: pickle.loads(value) for name, value in payload.items()}
+    except (OSError, EOFError, ImportError, AttributeError, TypeError, ValueError, pickle.UnpicklingError):
+        # Anything from a missing entry to objects that can't be rebuilt
+        # anymore means executing the cell
+        return None
+    try:
+        # Most recently used
+        os.utime(_entry_path(key))
+    except OSError:
+        pass
+    return names, deps
+
+
+def store(key, module, bound, used, imported, deps):
+    """
+    Store the values of the names a cell bound & used in module, for key
+
+    imported are the notebook modules the cell imported, deps their
+    notebook_fingerprints. Returns whether it was stored: not when a name
+    bound can't be pickled, or is a function or class defined in the module.
+    """
+    namespace = module.__dict__
+    # Each value is pickled on its own, once, the ones that can't be skipped
+    payload = {}
+    for name in bound:
+        value = namespace[name]
+        if getattr(value, '__module__', None) == module.__name__ and callable(value):
+            return False
+        payload[name] = _dumps_or_none(value)
+        if payload[name] is None:
+            return False
+    # Names the cell only used, that it might have changed in place
+    for name in used:
+        value = namespace[name]
+        if not isinstance(value, (types.ModuleType, types.FunctionType, type)):
+            pickled = _dumps_or_none(value)
+            if pickled is not None:
+                payload[name] = pickled
+    data = pickle.dumps((deps, imported, payload), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) > config.memo_max_size:
+        return False
+    try:
+        os.makedirs(memo_dir(), exist_ok=True)
+        cache.write_atomic(_entry_path(key), data)
+    except OSError:
+        return False
+    evict()
+    return True
+
+
+def evict(max_size=None):
+    """
+    Remove the least recently used entries until the cache is under max_size
+
+    max_size defaults to ipynb.config.memo_max_size.
+    """
+    if max_size is None:
+        max_size = config.memo_max_size
+    directory = memo_dir()
+    with _lock:
+        entries = []
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.pickle'):
+                continue
+            try:
+                st = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= max_size:
+                break
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+            total -= size
+
+
+def clear():
+    """
+    Remove everything from the cache
+    """
+    evict(0)
+
+
+def exec_memoized(loader, module):
+    """
+    Execute the module's cells one by one, restoring the ones memoized
+    """
+    fullname = module.__name__
+    codes = loader.get_cell_codes(fullname)
+    nb = loader.load_notebook(fullname)
+    cells = [(index, cell) for index, cell in enumerate(nb['cells']) if cell['cell_type'] == 'code']
+    namespace = module.__dict__
+    # Copies of the notebook elsewhere, in other projects, get entries of their own
+    start = (MAGIC_NUMBER, fullname, loader.flavor, os.path.abspath(loader.path))
+    chain = hashlib.sha1(repr(start).encode('utf-8'))
+    with instrument.phase(fullname, 'exec') as counts:
+        for (index, cell), code in zip(cells, codes):
+            source = ''.join(cell['source'])
+            chain.update(hashlib.sha1(source.encode('utf-8')).digest())
+            key = chain.hexdigest()
+            with profile.cell(fullname, index, cell.get('id'), source):
+                restored = load(key)
+                if restored is not None:
+                    names, deps = restored
+                    namespace.update(names)
+                    counts['cells_restored'] = counts.get('cells_restored', 0) + 1
+                else:
+                    before = {name: id(value) for name, value in namespace.items()}
+                    known = set(sys.modules)
+                    exec(code, namespace)
+                    bound = [
+                        name for name, value in namespace.items()
+                        if before.get(name) != id(value) and not _is_dunder(name)
+                    ]
+                    used = [
+                        name for name in _names_used(code)
+                        if name in before and name not in bound and not _is_dunder(name)
+                    ]
+                    imported = _imported_notebooks(code, namespace, module.__package__, known)
+                    deps = notebook_fingerprints(imported)
+                    store(key, module, bound, used, imported, deps)
+            record_imports(module, [code])
+            # Later cells depend on the notebooks imported so far too
+            chain.update(repr(deps).encode('utf-8'))
+
+
+def _imported_notebooks(code, namespace, package, known):
+    """
+    Return the notebook modules a cell imported, sorted
+
+    Those are the ones imported by its code, the code nested in it & the
+    functions of the namespace it refers to, as well as the ones imported for
+    the first time while it ran, from anywhere. known are the modules that
+    were imported before it ran.
+    """
+    names = {name for name in list(sys.modules) if name not in known}
+    todo = [(code, package)]
+    for name in _names_used(code):
+        value = namespace.get(name)
+        if isinstance(value, types.FunctionType):
+            todo.append((value.__code__, value.__globals__.get('__package__')))
+    while todo:
+        code, package = todo.pop()
+        names.update(imported_names(code, package))
+        todo.extend((const, package) for const in code.co_consts if isinstance(const, types.CodeType))
+    return sorted(name for name in names if _is_notebook(name))
+
+
+def _is_dunder(name):
+    return name.startswith('__') and name.endswith('__')
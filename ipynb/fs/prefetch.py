@@ -0,0 +1,147 @@
+"""
+Load the notebooks a notebook imports before its code gets to the imports.
+
+When a notebook is compiled, the notebook modules it imports are picked out of
+its code, and read, parsed & compiled in background threads while the
+notebook itself is still being loaded and executed. The modules they import
+are prefetched in turn as they get compiled, so a chain of notebooks
+importing each other is loaded in parallel rather than one at a time.
+
+Only loading is done ahead of time, executing the modules is left to the
+imports. Turn it on with ipynb.config.prefetch.
+"""
+import ast
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ipynb import config
+from ipynb.fs.finder import finder, find_spec
+from ipynb.fs.loader import NotebookLoader
+
+WORKERS = 4
+
+_executor = None
+# Names of the modules submitted to the executor and not loaded yet
+_queued = set()
+_lock = threading.Lock()
+
+
+def package_of(loader):
+    """
+    Return the package relative imports in the loader's module are from
+    """
+    if loader.is_package(loader.name):
+        return loader.name
+    return loader.name.rpartition('.')[0]
+
+
+def imported_modules(nodes, package):
+    """
+    Return the names of the notebook modules imported by the nodes, in order
+
+    Imports within function bodies are left out, they might never run. Parent
+    packages are listed before their modules, and `from package import name`
+    lists package.name as well, in case it's a module.
+    """
+    prefixes = tuple(prefix + '.' for prefix in finder.flavors)
+    names = []
+
+    def add(name):
+        parts = name.split('.')
+        for i in range(1, len(parts) + 1):
+            parent = '.'.join(parts[:i])
+            if parent.startswith(prefixes) and parent not in names:
+                names.append(parent)
+
+    def visit(node):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            return
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                add(alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                # Relative to the package, minus one level per extra dot
+                parent = package.rsplit('.', node.level - 1)[0] if package else ''
+                base = '.'.join(part for part in (parent, base) if part)
+            add(base)
+            for alias in node.names:
+                if alias.name != '*':
+                    add(base + '.' + alias.name)
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    for node in nodes:
+        visit(node)
+    return names
+
+
+def imported_modules_of_cells(sources, package):
+    """
+    Return the notebook modules imported by the sources of code cells
+
+    Only the cells that mention one of the prefixes or a relative import are
+    parsed, as well as they can be.
+    """
+    names = []
+    for source in sources:
+        if 'import' not in source:
+            continue
+        if 'from .' not in source and not any(prefix in source for prefix in finder.flavors):
+            continue
+        try:
+            nodes = ast.parse(source).body
+        except SyntaxError:
+            # Compiling the notebook will report it
+            continue
+        names.extend(name for name in imported_modules(nodes, package) if name not in names)
+    return names
+
+
+def prefetch(names):
+    """
+    Start loading the modules called names in background threads
+
+    Modules already imported or being prefetched are skipped.
+    """
+    global _executor
+    if not config.prefetch:
+        return
+    with _lock:
+        for name in names:
+            if name in sys.modules or name in _queued:
+                continue
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='ipynb-prefetch')
+            _queued.add(name)
+            _executor.submit(_warm, name)
+
+
+def wait():
+    """
+    Wait for the modules being prefetched to be loaded
+    """
+    global _executor
+    while True:
+        # Modules being loaded can prefetch more, with another executor
+        with _lock:
+            executor, _executor = _executor, None
+        if executor is None:
+            return
+        executor.shutdown(wait=True)
+
+
+def _warm(name):
+    try:
+        spec = find_spec(name)
+        if spec is not None and isinstance(spec.loader, NotebookLoader):
+            spec.loader.warm(name)
+    except Exception:  # pylint: disable=broad-except
+        # Whatever went wrong, the import will raise it again, where the
+        # application expects it
+        pass
+    finally:
+        with _lock:
+            _queued.discard(name)
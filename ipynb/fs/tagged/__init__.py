@@ -0,0 +1,76 @@
+"""
+FileSystem based importer for ipynb / .py files that leaves out cells by tags.
+
+Same as ipynb.fs.full, except for the code cells with tags excluded by
+ipynb.config.exclude_tags, or not included by ipynb.config.include_tags:
+
+```
+import ipynb.config
+ipynb.config.exclude_tags = {'skip-import', 'heavy'}
+
+from ipynb.fs.tagged.notebook import model
+```
+
+Cells get tags from their metadata, which can be edited in Jupyter under
+View > Cell Toolbar > Tags.
+"""
+import hashlib
+
+from ipynb import config
+from ipynb.fs.finder import register
+from ipynb.fs.full import FullLoader
+
+
+def cell_tags(cell):
+    """
+    Return the set of tags of a cell
+    """
+    tags = cell.get('metadata', {}).get('tags', ())
+    return frozenset(tag for tag in tags if isinstance(tag, str))
+
+
+class TaggedLoader(FullLoader):
+    """
+    A notebook loader that loads the code cells selected by their tags
+
+    The selection is taken from ipynb.config when the module is found. Cells
+    left out are imported as blank lines, so that line numbers in tracebacks
+    still match the notebook's.
+
+    The code is cached apart for each selection: the flavor is `tagged-` and a
+    hash of the tags.
+
+    If it isn't an .ipynb file, it's treated the same as a .py file.
+    """
+    flavor = 'tagged'
+
+    def __init__(self, fullname, path):
+        super().__init__(fullname, path)
+        self.exclude_tags = frozenset(config.exclude_tags)
+        self.include_tags = None if config.include_tags is None else frozenset(config.include_tags)
+        selection = repr((
+            sorted(self.exclude_tags),
+            None if self.include_tags is None else sorted(self.include_tags),
+        ))
+        self.flavor = 'tagged-' + hashlib.sha1(selection.encode('utf-8')).hexdigest()[:8]
+
+    def selects(self, cell):
+        """
+        Return whether a code cell is imported, based on its tags
+        """
+        tags = cell_tags(cell)
+        if tags & self.exclude_tags:
+            return False
+        return self.include_tags is None or bool(tags & self.include_tags)
+
+    def select_cells(self, nb):
+        cells = []
+        for cell in nb.get('cells', ()):
+            if cell['cell_type'] == 'code' and not self.selects(cell):
+                source = ''.join(cell['source'])
+                cell = dict(cell, source='\n' * source.count('\n'))
+            cells.append(cell)
+        return dict(nb, cells=cells)
+
+
+register(__package__, TaggedLoader)
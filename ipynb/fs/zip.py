@@ -0,0 +1,139 @@
+"""
+Loaders for notebooks inside zip archives on sys.path, like zipimport.
+
+```
+sys.path.append('notebooks.zip')
+
+import ipynb.fs.full.notebook
+```
+
+Notebooks are read straight out of the archive, without extracting it. Each
+archive is opened once, and the index of its contents is kept until the
+archive changes.
+
+The archive can hold precompiled code, at the same place relative to the
+notebooks as in a tree compiled by `python -m ipynb.compileall`:
+
+    $ python -m ipynb.compileall notebooks/
+    $ cd notebooks && zip -r ../notebooks.zip .
+
+Nothing is ever written to the archives. FSFinder looks in the archives on
+sys.path along with the directories, in order.
+"""
+import os
+import time
+import zipfile
+import threading
+import functools
+
+from ipynb.fs import cache
+from ipynb.fs.loader import ReadOnlyLoaderMixin
+
+# archive path -> _Archive
+_archives = {}
+_lock = threading.Lock()
+
+
+class _Archive:
+    """
+    An open zip archive along with the index of what's in it
+    """
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        self.zipfile = zipfile.ZipFile(path)
+        self.infos = {info.filename: info for info in self.zipfile.infolist()}
+        self._lock = threading.Lock()
+
+    def member(self, path):
+        """
+        Return the name in the archive of the file at path, under the archive's
+        """
+        return os.path.relpath(path, self.path).replace(os.sep, '/')
+
+    def read(self, name):
+        """
+        Return the contents of the file called name in the archive
+        """
+        if name not in self.infos:
+            raise FileNotFoundError('No {name} in {path}'.format(name=name, path=self.path))
+        with self._lock:
+            return self.zipfile.read(self.infos[name])
+
+
+def open_archive(path):
+    """
+    Return the _Archive at path, opening it again if it changed
+    """
+    mtime = os.stat(path).st_mtime
+    with _lock:
+        archive = _archives.get(path)
+        if archive is None or archive.mtime != mtime:
+            archive = _archives[path] = _Archive(path)
+        return archive
+
+
+@functools.lru_cache(maxsize=None)
+def split_entry(entry):
+    """
+    Return (archive path, path inside it) for a sys.path entry, or None
+
+    Returns None if the entry isn't in an archive. Like for zipimport, an entry
+    can point at a directory inside an archive, as in `notebooks.zip/lib`.
+    """
+    path, inner = entry, []
+    while path and not os.path.isdir(path):
+        if os.path.isfile(path):
+            if zipfile.is_zipfile(path):
+                return path, '/'.join(reversed(inner))
+            return None
+        path, tail = os.path.split(path)
+        if not tail:
+            return None
+        inner.append(tail)
+    return None
+
+
+class ZipLoaderMixin(ReadOnlyLoaderMixin):
+    """
+    Mixin for NotebookLoader classes, reading the notebooks from a zip archive
+
+    The container is the _Archive. Cached code is only ever read, from the
+    archive.
+    """
+    kind = 'Zip'
+
+    def get_data(self, path):
+        """
+        Return the contents of the file at path, from the archive
+        """
+        return self.container.read(self.container.member(path))
+
+    def path_stats(self, path):
+        """
+        Return the stats of the file at path, as recorded in the archive
+        """
+        info = self.container.infos.get(self.container.member(path))
+        if info is None:
+            raise FileNotFoundError(path)
+        return {'mtime': time.mktime(info.date_time + (0, 0, -1)), 'size': info.file_size}
+
+    def _read_cache(self, flavor):
+        cpath = cache.cache_path(self.path, flavor)
+        try:
+            return self.container.read(self.container.member(cpath)) if cpath is not None else None
+        except OSError:
+            return None
+
+    def load_cached_code(self, stats, nb_fingerprint=None):
+        """
+        Return the code compiled ahead of time into the archive, or None
+        """
+        # Zip archives only store mtimes to 2 seconds
+        return cache.unpack_code(self._read_cache(self.flavor), stats, nb_fingerprint, mtime_slack=2)
+
+    def load_cached_cells(self):
+        """
+        Return the code of the cells compiled ahead of time into the archive
+        """
+        return cache.unpack_cells(self._read_cache(self.flavor + '-cells'))
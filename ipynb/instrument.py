@@ -0,0 +1,217 @@
+"""
+Opt-in timing of what happens when notebooks get imported.
+
+```
+import ipynb.instrument
+ipynb.instrument.enable()
+
+import ipynb.fs.full.notebook
+
+print(ipynb.instrument.format_tree())
+```
+
+For every module imported through ipynb.fs, this records how long each of
+these phases took, along with a few counts:
+
+ - find: looking for the file (sys.path entries probed, stat & listdir calls)
+ - cache: looking up the cached code (whether it was a hit)
+ - read: reading the notebook file (bytes)
+ - parse: picking the cells out of it (cells)
+ - assemble: putting together the module's source (bytes)
+ - filter: keeping only definitions, for ipynb.fs.defs (cells, nodes kept)
+ - compile: compiling the source
+ - exec: executing the module, including the modules it imports
+
+Modules imported while another is executing are recorded as its children.
+Modules loaded ahead of their import by ipynb.fs.prefetch are recorded on
+their own, as they're loaded in other threads.
+"""
+import time
+import threading
+
+
+_enabled = False
+_records = []
+_local = threading.local()
+
+
+class ModuleRecord:
+    """
+    Everything recorded about one import of one module
+    """
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.children = []
+        # phase name -> {'seconds': ..., other counts}
+        self.phases = {}
+
+    @property
+    def cumulative(self):
+        """
+        Total seconds spent importing the module, children included
+        """
+        return sum(p['seconds'] for p in self.phases.values())
+
+    @property
+    def self_time(self):
+        """
+        Seconds spent importing the module, not counting its children
+        """
+        return self.cumulative - sum(c.cumulative for c in self.children)
+
+    def as_dict(self):
+        """
+        Return the record, and its children's, as a JSON serializable dict
+        """
+        return {
+            'name': self.name,
+            'seconds': self.cumulative,
+            'self_seconds': self.self_time,
+            'phases': {name: dict(phase) for name, phase in self.phases.items()},
+            'children': [c.as_dict() for c in self.children],
+        }
+
+
+class _Phase:
+    """
+    Context manager timing one phase, returning a dict to put counts in
+    """
+    def __init__(self, fullname, name):
+        self.fullname = fullname
+        self.name = name
+        self.counts = {}
+        self.start = None
+
+    def __enter__(self):
+        if self.name == 'exec':
+            # Modules imported from here on are this one's children
+            _stack().append(_record_for(self.fullname))
+        self.start = time.perf_counter()
+        return self.counts
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        if self.name == 'exec':
+            _stack().pop()
+        if self.name == 'find':
+            # Finding a module is the start of a new import of it
+            record = _new_record(self.fullname)
+        else:
+            record = _record_for(self.fullname)
+        totals = record.phases.setdefault(self.name, {'seconds': 0})
+        totals['seconds'] += seconds
+        for key, value in self.counts.items():
+            totals[key] = totals.get(key, 0) + value
+        return False
+
+
+class _NullPhase:
+    """
+    What phase() returns when instrumentation is disabled
+    """
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def _stack():
+    """
+    Return this thread's stack of records for the modules being executed
+    """
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _new_record(fullname):
+    """
+    Start a new record for fullname, as a child of the module executing
+    """
+    stack = _stack()
+    record = ModuleRecord(fullname, stack[-1] if stack else None)
+    if record.parent is None:
+        _records.append(record)
+    else:
+        record.parent.children.append(record)
+    _local.latest = getattr(_local, 'latest', {})
+    _local.latest[fullname] = record
+    return record
+
+
+def _record_for(fullname):
+    """
+    Return the latest record for fullname, starting one if there isn't any
+    """
+    record = getattr(_local, 'latest', {}).get(fullname)
+    return record if record is not None else _new_record(fullname)
+
+
+def phase(fullname, name):
+    """
+    Return a context manager recording the time taken by a phase of an import
+
+    It gives a dict that counts (bytes, cells, ...) can be added to.
+    """
+    return _Phase(fullname, name) if _enabled else _NULL_PHASE
+
+
+def enable():
+    """
+    Start recording imports
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """
+    Stop recording imports, keeping what was recorded so far
+    """
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """
+    Forget everything recorded so far
+    """
+    del _records[:]
+    _local.__dict__.clear()
+
+
+def report():
+    """
+    Return what was recorded, as a list of JSON serializable dicts
+
+    One for each module imported from outside of a notebook import, with the
+    modules they imported in turn as their children.
+    """
+    return [r.as_dict() for r in _records]
+
+
+def format_tree():
+    """
+    Return what was recorded as text, like `python -X importtime` does
+    """
+    lines = ['ipynb import time: self [us] | cumulative | module']
+
+    def add(record, depth):
+        lines.append('ipynb import time: {self:>9} | {cumulative:>10} | {indent}{name} ({phases})'.format(
+            self=int(record.self_time * 1e6),
+            cumulative=int(record.cumulative * 1e6),
+            indent='  ' * depth,
+            name=record.name,
+            phases=', '.join('{}={}'.format(name, int(p['seconds'] * 1e6)) for name, p in record.phases.items()),
+        ))
+        for child in record.children:
+            add(child, depth + 1)
+
+    for record in _records:
+        add(record, 0)
+    return '\n'.join(lines)
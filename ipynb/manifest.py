@@ -0,0 +1,126 @@
+"""
+Record which notebooks a process imports, to get them ready faster next time.
+
+```
+import ipynb.manifest
+ipynb.manifest.start()
+...  # the imports
+ipynb.manifest.save('notebooks.json')
+```
+
+and at the start of the next run:
+
+```
+import ipynb.manifest
+ipynb.manifest.preload('notebooks.json')
+```
+
+The manifest lists the modules imported through ipynb.fs, in the order they
+were imported, along with the paths they were found at. Preloading tells the
+finder where each module is, so it doesn't look through sys.path for them,
+and loads their code ahead of the imports, in parallel. With
+`import_modules=True`, it also imports the modules, in the same order.
+
+The paths in the manifest are trusted for as long as there are files there,
+even if sys.path changed since.
+"""
+import json
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+from ipynb.fs import loader
+from ipynb.fs.finder import finder, find_spec
+
+FORMAT_VERSION = 1
+
+
+def start():
+    """
+    Start recording the modules imported through ipynb.fs
+    """
+    if loader.recording is None:
+        loader.recording = []
+
+
+def stop():
+    """
+    Stop recording, returning what was recorded, see entries
+    """
+    recorded = entries()
+    loader.recording = None
+    return recorded
+
+
+def entries():
+    """
+    Return the modules recorded so far, as a list of dicts
+
+    Each has the module's `name`, the `path` it was loaded from & the loader's
+    `flavor`, in the order they were first imported.
+    """
+    seen = set()
+    recorded = []
+    for name, path, flavor in loader.recording or ():
+        if name not in seen:
+            seen.add(name)
+            recorded.append({'name': name, 'path': path, 'flavor': flavor})
+    return recorded
+
+
+def save(path):
+    """
+    Write the modules recorded so far to a manifest file at path
+    """
+    with open(path, 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'modules': entries()}, f, indent=1)
+
+
+def load(path):
+    """
+    Return the modules listed in the manifest file at path, see entries
+
+    Raises ValueError if it isn't a manifest this version can read.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or manifest.get('version') != FORMAT_VERSION:
+        raise ValueError('{path} is not a version {version} ipynb manifest'.format(
+            path=path,
+            version=FORMAT_VERSION
+        ))
+    return manifest['modules']
+
+
+def _warm(entry):
+    try:
+        # Finding it imports the packages above the flavor's prefix, which
+        # might not be there anymore
+        spec = find_spec(entry['name'])
+        if spec is not None and isinstance(spec.loader, loader.NotebookLoader):
+            spec.loader.warm(entry['name'])
+    except (ImportError, SyntaxError, OSError, ValueError):
+        # The import will raise it again, where the application expects it
+        pass
+
+
+def preload(path, jobs=None, import_modules=False):
+    """
+    Get the modules listed in the manifest at path ready to be imported
+
+    Their code is loaded with jobs threads, or as many as there are CPUs for
+    None. With import_modules, they are then imported in the order they were
+    recorded. Returns the list of modules in the manifest.
+    """
+    modules = load(path)
+    for entry in modules:
+        finder.seed(entry['name'], entry['path'])
+    if jobs == 1:
+        for entry in modules:
+            _warm(entry)
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(_warm, modules))
+    if import_modules:
+        for entry in modules:
+            importlib.import_module(entry['name'])
+    return modules
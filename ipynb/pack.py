@@ -0,0 +1,146 @@
+"""
+Pack a tree of notebooks into a single bundle file, see ipynb.fs.bundle.
+
+    python -m ipynb.pack -o BUNDLE [-q] [--flavor FLAVOR] DIR [...]
+
+Each DIR is taken as a sys.path entry: the notebooks and .py files under it are
+packed with the module names they'd be imported with, notebooks compiled for
+each of the ipynb.fs flavors. When several DIRs have the same module, the
+first one's is packed, as the finder would import it.
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+from ipynb.compileall import FLAVORS
+from ipynb.fs.bundle import write_bundle
+from ipynb.fs.loader import NotebookLoader
+from ipynb.utils import fingerprint
+
+# Which of the files for the same module name the finder picks, first to last
+_PRIORITY = ('{}.ipynb', '{}.py', '{}/__init__.ipynb', '{}/__init__.py')
+
+
+def find_modules(directory):
+    """
+    Return {module name: path} for the notebooks and .py files under directory
+
+    Only files & directories with names that are valid module names are
+    considered, same as FSFinder.
+    """
+    ranked = {}
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d.isidentifier() and d != '__pycache__')
+        relroot = os.path.relpath(root, directory)
+        parts = [] if relroot == os.curdir else relroot.split(os.sep)
+        for filename in files:
+            name, ext = os.path.splitext(filename)
+            if ext not in ('.ipynb', '.py') or not name.isidentifier():
+                continue
+            if name == '__init__':
+                if not parts:
+                    continue
+                module, pattern = '.'.join(parts), '{}/__init__' + ext
+            else:
+                module, pattern = '.'.join(parts + [name]), '{}' + ext
+            rank = _PRIORITY.index(pattern)
+            if module not in ranked or rank < ranked[module][0]:
+                ranked[module] = (rank, os.path.join(root, filename))
+    return {module: path for module, (_, path) in ranked.items()}
+
+
+def pack_module(name, path, relpath, origin, flavors=tuple(FLAVORS)):
+    """
+    Return the module at path as write_bundle expects it, and a list of errors
+
+    origin is where the module will be in the bundle, for the code's filename.
+    The module is None if it can't be packed at all.
+    """
+    st = os.stat(path)
+    stats = {'mtime': st.st_mtime, 'size': st.st_size}
+    if not path.endswith('.ipynb'):
+        with open(path, 'rb') as f:
+            source = f.read()
+        module = {'path': relpath, 'source': source, 'stats': stats, 'codes': {}}
+        module['fingerprint'] = hashlib.sha1(source).digest()
+        return module, []
+
+    errors = []
+    try:
+        nb = NotebookLoader(name, path).load_notebook(name)
+    except (ImportError, OSError) as e:
+        return None, ['{path}: {error}'.format(path=path, error=e)]
+    codes = {}
+    for flavor in flavors:
+        prefix, loader_class = FLAVORS[flavor]
+        loader = loader_class('{}.{}'.format(prefix, name), origin)
+        try:
+            # Under the loader's own flavor, which can depend on ipynb.config
+            codes[loader.flavor] = loader.code_from_notebook(loader.select_cells(nb))
+        except SyntaxError as e:
+            errors.append('{path} ({flavor}): {error}'.format(path=path, flavor=flavor, error=e))
+    module = {
+        'path': relpath,
+        # Only what the reader keeps, outputs would just take up space
+        'source': json.dumps(nb).encode('utf-8'),
+        'stats': stats,
+        'fingerprint': fingerprint(nb),
+        'codes': codes,
+    }
+    return module, errors
+
+
+def pack(output, directories, flavors=tuple(FLAVORS)):
+    """
+    Write the bundle of the modules under directories at output
+
+    Generates the paths of the modules packed along with the list of errors
+    for each. The bundle is written once they've all been generated.
+    """
+    output = os.path.abspath(output)
+    found = {}
+    for directory in directories:
+        for name, path in find_modules(directory).items():
+            if name not in found:
+                found[name] = (directory, path)
+
+    modules = {}
+    for name, (directory, path) in sorted(found.items()):
+        relpath = os.path.relpath(path, directory).replace(os.sep, '/')
+        origin = os.path.join(output, *relpath.split('/'))
+        module, errors = pack_module(name, path, relpath, origin, flavors)
+        if module is not None:
+            modules[name] = module
+        yield path, errors
+    write_bundle(output, modules)
+
+
+def main(argv=None):
+    """
+    Command line entry point, returns the process exit status
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m ipynb.pack',
+        description='Pack notebooks and their compiled code into a single bundle file.'
+    )
+    parser.add_argument('directories', nargs='+', metavar='DIR', help='directories to pack, as on sys.path')
+    parser.add_argument('-o', '--output', required=True, help='path of the bundle to write')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only print errors')
+    parser.add_argument('--flavor', action='append', choices=sorted(FLAVORS),
+                        help='only compile for this flavor, can be given more than once')
+    args = parser.parse_args(argv)
+
+    success = True
+    for path, errors in pack(args.output, args.directories, tuple(args.flavor or FLAVORS)):
+        if not args.quiet:
+            print('Packing {}'.format(path))
+        for error in errors:
+            print('*** ' + error, file=sys.stderr)
+            success = False
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Opt-in profiling of the cells notebooks execute when they're imported.
+
+```
+import ipynb.profile
+ipynb.profile.enable(memory=True)
+
+import ipynb.fs.full.notebook
+
+print(ipynb.profile.format_report(limit=10))
+```
+
+While enabled, notebooks are executed cell by cell, the same way as with
+ipynb.config.per_cell, and each cell's execution is timed. With memory=True,
+tracemalloc is started too, and the change in traced memory over each cell is
+recorded. That slows everything down a fair bit, so it's best left off when
+timing only matters.
+
+Cells are recorded by the module they're in, their index in the notebook's
+cells, counting markdown cells too, and their id, for notebooks that have them.
+The time & memory of a cell include the notebooks it imports, `self_seconds`
+and `self_memory` leave them out.
+"""
+import time
+import threading
+import tracemalloc
+
+
+_enabled = False
+_memory = False
+# Whether tracemalloc was started by enable, and so should be stopped by disable
+_started_tracemalloc = False
+_records = []
+_local = threading.local()
+
+
+class CellRecord:
+    """
+    Everything recorded about one execution of one cell
+    """
+    def __init__(self, module, index, cell_id, source):
+        self.module = module
+        self.index = index
+        self.id = cell_id
+        # First line of the cell, to tell it apart
+        self.line = source.strip().partition('\n')[0]
+        self.seconds = 0
+        self.memory = None
+        # Time & memory spent in cells of the notebooks this one imported
+        self.children_seconds = 0
+        self.children_memory = 0
+
+    def as_dict(self):
+        """
+        Return the record as a JSON serializable dict
+        """
+        return {
+            'module': self.module,
+            'index': self.index,
+            'id': self.id,
+            'line': self.line,
+            'seconds': self.seconds,
+            'self_seconds': self.seconds - self.children_seconds,
+            'memory': self.memory,
+            'self_memory': None if self.memory is None else self.memory - self.children_memory,
+        }
+
+
+class _Cell:
+    """
+    Context manager recording the execution of one cell
+    """
+    def __init__(self, record):
+        self.record = record
+        self.start = None
+        self.start_memory = None
+
+    def __enter__(self):
+        _stack().append(self.record)
+        if _memory and tracemalloc.is_tracing():
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        record = self.record
+        record.seconds = time.perf_counter() - self.start
+        if self.start_memory is not None:
+            record.memory = tracemalloc.get_traced_memory()[0] - self.start_memory
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].children_seconds += record.seconds
+            stack[-1].children_memory += record.memory or 0
+        return False
+
+
+class _NullCell:
+    """
+    What cell() returns when profiling is disabled
+    """
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_CELL = _NullCell()
+
+
+def _stack():
+    """
+    Return this thread's stack of records for the cells being executed
+    """
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def cell(module, index, cell_id, source):
+    """
+    Return a context manager recording the execution of a cell
+
+    module is the name of the module the cell is executed in, index & cell_id
+    the cell's index in the notebook and id, which can be None.
+    """
+    if not _enabled:
+        return _NULL_CELL
+    record = CellRecord(module, index, cell_id, source)
+    _records.append(record)
+    return _Cell(record)
+
+
+def is_enabled():
+    """
+    Return whether cells are being profiled
+    """
+    return _enabled
+
+
+def enable(memory=False):
+    """
+    Start profiling cells, along with their memory allocations if memory is set
+    """
+    global _enabled, _memory, _started_tracemalloc
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _memory = memory
+    _enabled = True
+
+
+def disable():
+    """
+    Stop profiling cells, keeping what was recorded so far
+    """
+    global _enabled, _memory, _started_tracemalloc
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    _enabled = _memory = False
+
+
+def reset():
+    """
+    Forget everything recorded so far
+    """
+    del _records[:]
+
+
+def report(by='seconds'):
+    """
+    Return what was recorded as a list of JSON serializable dicts, costliest first
+
+    by is the key to sort on: seconds, self_seconds, memory or self_memory.
+    """
+    return sorted((r.as_dict() for r in _records), key=lambda r: r[by] or 0, reverse=True)
+
+
+def format_report(by='seconds', limit=None):
+    """
+    Return what was recorded as a table, the limit costliest cells first
+    """
+    lines = ['{:>10} | {:>10} | {:>12} | cell'.format('self [us]', 'total [us]', 'memory [B]')]
+    for r in report(by)[:limit]:
+        lines.append('{self:>10} | {total:>10} | {memory:>12} | {module}[{index}]{id} {line}'.format(
+            self=int(r['self_seconds'] * 1e6),
+            total=int(r['seconds'] * 1e6),
+            memory='-' if r['memory'] is None else r['memory'],
+            module=r['module'],
+            index=r['index'],
+            id='' if r['id'] is None else ' ({})'.format(r['id']),
+            line=r['line'][:60],
+        ))
+    return '\n'.join(lines)
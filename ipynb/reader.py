@@ -0,0 +1,381 @@
+"""
+Incremental reader that picks only the parts we need out of a notebook file.
+
+Notebooks can be mostly made of outputs - images, HTML tables, etc - that we
+never use. Instead of decoding the whole JSON document, this scans the raw
+bytes and only decodes nbformat, the kernelspec language and each cell's
+type, source, id and tags. Everything else in big cells is skipped over without being
+built. Small cells are cheaper to hand over to the json module whole.
+
+What was read is kept in parse_cache, shared by everything that reads notebooks
+in the process, so a notebook imported through both ipynb.fs.full and
+ipynb.fs.defs is only parsed once.
+"""
+import os
+import re
+import json
+import codecs
+import threading
+from collections import OrderedDict
+
+
+_WS = re.compile(rb'[ \t\n\r]*')
+# An object's key, up to the start of its value
+_KEY = re.compile(rb'[ \t\n\r]*"([^"\\]*(?:\\.[^"\\]*)*)"[ \t\n\r]*:[ \t\n\r]*', re.DOTALL)
+# What comes after a value in an object or array
+_NEXT = re.compile(rb'[ \t\n\r]*([,\]\}])')
+# Anything that can end a number / true / false / null
+_SCALAR = re.compile(rb'[^,\]\}\s]+')
+# Runs of bytes that don't change the nesting depth: anything but brackets,
+# and strings short enough that the regex engine gets past them quickly.
+_FILLER = re.compile(rb'(?:[^"\[\]\{\}]+|"[^"\\]{0,256}(?:\\.[^"\\]{0,256})*")*', re.DOTALL)
+
+# Keys we keep from each cell, along with the tags in its metadata
+CELL_KEYS = ('cell_type', 'source', 'id')
+# Cells up to that many bytes are decoded whole, outputs and all. It's faster
+# to have the json module do that than picking through them in python.
+SMALL_VALUE = 32768
+# Same for whole notebooks
+SMALL_NOTEBOOK = 1 << 20
+
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    """
+    Walks over a JSON document held in a bytes-like object
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 3 if buf[:3] == codecs.BOM_UTF8 else 0
+
+    def error(self, msg):
+        """
+        Return a ValueError for the current position, like json.load would raise
+        """
+        return ValueError('{msg} at byte {pos}'.format(msg=msg, pos=self.pos))
+
+    def peek(self):
+        """
+        Skip whitespace and return the next byte, without consuming it
+        """
+        self.pos = _WS.match(self.buf, self.pos).end()
+        return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        """
+        Consume the next non whitespace byte, which must be char
+        """
+        if self.peek() != char:
+            raise self.error('Expecting {char!r}'.format(char=char.decode()))
+        self.pos += 1
+
+    def skip(self):
+        """
+        Move past the next value without decoding it
+        """
+        char = self.peek()
+        if char == b'"':
+            self._skip_string()
+        elif char in (b'[', b'{'):
+            self._skip_container()
+        else:
+            match = _SCALAR.match(self.buf, self.pos)
+            if match is None:
+                raise self.error('Expecting value')
+            self.pos = match.end()
+
+    def _skip_container(self):
+        # Short strings and everything that isn't a bracket are skipped over by
+        # the regex engine. Long strings, like base64 encoded images, are a lot
+        # faster to get past with bytes.find.
+        buf = self.buf
+        depth = 0
+        while True:
+            self.pos = _FILLER.match(buf, self.pos).end()
+            char = buf[self.pos:self.pos + 1]
+            if char == b'"':
+                self._skip_string()
+                continue
+            if not char:
+                raise self.error('Unterminated value')
+            self.pos += 1
+            depth += 1 if char in (b'[', b'{') else -1
+            if depth == 0:
+                return
+
+    def _skip_string(self):
+        # bytes.find is a lot faster than a regex on long strings, like base64
+        # encoded images. A quote only ends the string if it isn't escaped,
+        # that is preceded by an even number of backslashes.
+        buf = self.buf
+        end = self.pos + 1
+        while True:
+            end = buf.find(b'"', end)
+            if end == -1:
+                raise self.error('Unterminated string')
+            backslash = end - 1
+            while buf[backslash] == 0x5c:
+                backslash -= 1
+            if (end - 1 - backslash) % 2 == 0:
+                self.pos = end + 1
+                return
+            end += 1
+
+    def value(self):
+        """
+        Decode and return the next value
+        """
+        start = _WS.match(self.buf, self.pos).end()
+        self.skip()
+        return _decoder.raw_decode(self.buf[start:self.pos].decode('utf-8'))[0]
+
+    def small_value(self):
+        """
+        Decode and return the next value if it is small, else return None
+
+        Most cells are small, and it's a lot faster to let the json module
+        decode them whole than to pick through them. Tries with growing
+        windows of bytes, up to SMALL_VALUE, until the value fits in one.
+        """
+        start = _WS.match(self.buf, self.pos).end()
+        size = 2048
+        while size <= SMALL_VALUE:
+            window = self.buf[start:start + size]
+            try:
+                text = window.decode('utf-8')
+            except UnicodeDecodeError as e:
+                if e.start < len(window) - 3:
+                    raise
+                # The window ends in the middle of a character
+                text = window[:e.start].decode('utf-8')
+            try:
+                value, end = _decoder.raw_decode(text)
+            except ValueError:
+                if len(window) < size:
+                    # It's the end of the file, the value is broken
+                    raise self.error('Invalid value')
+                size *= 4
+                continue
+            self.pos = start + len(text[:end].encode('utf-8'))
+            return value
+        return None
+
+    def _next(self, close):
+        """
+        Move past the separator after a value, returning False after the last one
+        """
+        match = _NEXT.match(self.buf, self.pos)
+        if match is None or match.group(1) not in (b',', close):
+            raise self.error('Expecting \',\' delimiter')
+        self.pos = match.end()
+        return match.group(1) == b','
+
+    def members(self):
+        """
+        Iterate over the keys of the object at the current position
+
+        The caller has to consume (or skip) each key's value before asking for
+        the next key.
+        """
+        self.expect(b'{')
+        if self.peek() == b'}':
+            self.pos += 1
+            return
+        while True:
+            match = _KEY.match(self.buf, self.pos)
+            if match is None:
+                raise self.error('Expecting property name')
+            self.pos = match.end()
+            key = match.group(1)
+            yield key.decode('utf-8') if b'\\' not in key else json.loads(b'"' + key + b'"')
+            if not self._next(b'}'):
+                return
+
+    def elements(self):
+        """
+        Iterate over the array at the current position, yielding each index
+
+        The caller has to consume (or skip) each element.
+        """
+        self.expect(b'[')
+        if self.peek() == b']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if not self._next(b']'):
+                return
+
+
+def read_notebook(buf):
+    """
+    Read the importable parts of a notebook from buf, its raw bytes
+
+    Returns a dictionary with the same layout as the parsed JSON, but with
+    only `nbformat`, `metadata.kernelspec.language` and the cells' `cell_type`,
+    `source`, `id` and `metadata.tags` present. Raises ValueError if buf isn't valid JSON.
+    """
+    if len(buf) <= SMALL_NOTEBOOK:
+        return _pick(json.loads(buf[:].decode('utf-8-sig')))
+
+    scanner = _Scanner(buf)
+    nb = {'metadata': {}}
+    for key in scanner.members():
+        if key == 'nbformat':
+            nb['nbformat'] = scanner.value()
+        elif key == 'metadata' and scanner.peek() == b'{':
+            for mkey in scanner.members():
+                if mkey == 'kernelspec' and scanner.peek() == b'{':
+                    kernelspec = nb['metadata']['kernelspec'] = {}
+                    for kkey in scanner.members():
+                        if kkey == 'language':
+                            kernelspec['language'] = scanner.value()
+                        else:
+                            scanner.skip()
+                else:
+                    scanner.skip()
+        elif key == 'cells' and scanner.peek() == b'[':
+            cells = nb['cells'] = []
+            for _ in scanner.elements():
+                cell = scanner.small_value()
+                if cell is None:
+                    cell = {}
+                    for ckey in scanner.members():
+                        if ckey in CELL_KEYS or ckey == 'metadata':
+                            cell[ckey] = scanner.value()
+                        else:
+                            scanner.skip()
+                elif not isinstance(cell, dict):
+                    raise scanner.error('Expecting cell object')
+                cells.append(_pick_cell(cell))
+        else:
+            scanner.skip()
+    if scanner.peek():
+        raise scanner.error('Extra data')
+    return nb
+
+
+def _pick(full_nb):
+    """
+    Return the parts read_notebook reads out of a fully decoded notebook
+    """
+    if not isinstance(full_nb, dict):
+        raise ValueError('Expecting notebook object')
+    nb = {'metadata': {}}
+    if 'nbformat' in full_nb:
+        nb['nbformat'] = full_nb['nbformat']
+    metadata = full_nb.get('metadata')
+    if isinstance(metadata, dict) and isinstance(metadata.get('kernelspec'), dict):
+        kernelspec = metadata['kernelspec']
+        nb['metadata']['kernelspec'] = {'language': kernelspec['language']} if 'language' in kernelspec else {}
+    if isinstance(full_nb.get('cells'), list):
+        nb['cells'] = []
+        for cell in full_nb['cells']:
+            if not isinstance(cell, dict):
+                raise ValueError('Expecting cell object')
+            nb['cells'].append(_pick_cell(cell))
+    return nb
+
+
+def _pick_cell(cell):
+    """
+    Return the parts read_notebook keeps of a decoded cell
+    """
+    picked = {key: cell[key] for key in CELL_KEYS if key in cell}
+    metadata = cell.get('metadata')
+    if isinstance(metadata, dict) and isinstance(metadata.get('tags'), list):
+        picked['metadata'] = {'tags': metadata['tags']}
+    return picked
+
+
+class ParseCache:
+    """
+    Bounded LRU cache of read notebooks, keyed on their path and stats
+
+    The size of a notebook is counted as the length of its cells' sources.
+    Once the notebooks kept add up to more than max_size, the least recently
+    used ones are dropped. The notebooks it gives out are shared, so they must
+    not be modified.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # path -> (stats, notebook, size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, stats):
+        """
+        Return the notebook read from path when it had stats, or None
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != stats:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path, stats, nb):
+        """
+        Keep the notebook read from path when it had stats
+        """
+        size = sum(len(chunk) for cell in nb.get('cells', ()) for chunk in cell.get('source', ()))
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.size -= old[2]
+            if size > self.max_size:
+                return
+            self._entries[path] = (dict(stats), nb, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all the notebooks kept, and reset the stats
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """
+        Return the cache's stats as a dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size': self.size,
+                'max_size': self.max_size,
+            }
+
+
+parse_cache = ParseCache(32 << 20)
+
+
+def read_notebook_file(path):
+    """
+    Read the importable parts of the notebook at path, going through parse_cache
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        stats = {'mtime': st.st_mtime, 'size': st.st_size}
+        nb = parse_cache.get(path, stats)
+        if nb is None:
+            nb = read_notebook(f.read())
+            parse_cache.put(path, stats, nb)
+    return nb
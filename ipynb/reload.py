@@ -0,0 +1,262 @@
+"""
+Reload modules imported from notebooks when their code changes.
+
+```
+import ipynb.reload
+
+watcher = ipynb.reload.Watcher(dependents=True)
+watcher.start()
+```
+
+The watcher keeps track of every module imported through ipynb.fs from a
+notebook, and re-executes a module when the fingerprint of its notebook
+changes. Only the code cells' sources are looked at, so re-running a notebook,
+which only changes its outputs and execution counts, doesn't reload anything.
+
+With `dependents`, the notebook modules that imported a reloaded module are
+reloaded after it too, so they pick up its new definitions.
+
+On Linux, the watcher sleeps until inotify says something changed in the
+directories of the notebooks. Elsewhere, it polls their stats.
+"""
+import os
+import sys
+import select
+import importlib
+import threading
+import traceback
+import ctypes
+import ctypes.util
+
+from ipynb.fs.loader import NotebookLoader, importers
+from ipynb.reader import read_notebook
+from ipynb.utils import fingerprint
+
+
+def notebook_modules():
+    """
+    Return a dict of the modules imported from notebooks, name -> notebook path
+    """
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        spec = getattr(module, '__spec__', None)
+        if spec is not None and isinstance(spec.loader, NotebookLoader) and spec.origin.endswith('.ipynb'):
+            modules[name] = spec.origin
+    return modules
+
+
+def source_hash(path):
+    """
+    Return the fingerprint of the notebook at path, see ipynb.utils.fingerprint
+
+    Returns None if the notebook can't be read, which might just be because
+    it's being written.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return fingerprint(read_notebook(f.read()))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def reload_order(names, dependents=False):
+    """
+    Return the modules to reload, in order, when the given modules changed
+
+    With `dependents`, the modules that imported them (recursively) are
+    included, each after the modules it imported.
+    """
+    order = []
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        if dependents:
+            for importer in sorted(importers.get(name, ())):
+                visit(importer)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order[::-1]
+
+
+def reload(name, dependents=False):
+    """
+    Reload the module imported from a notebook, returning the reloaded names
+    """
+    names = [n for n in reload_order([name], dependents) if n in sys.modules]
+    for n in names:
+        importlib.reload(sys.modules[n])
+    return names
+
+
+class _Inotify:
+    """
+    Just enough of Linux's inotify to wait for files in directories to change
+    """
+    # IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE. Editors often save by writing
+    # another file & renaming it over the notebook, so directories are watched
+    # rather than the notebooks themselves.
+    MASK = 0x8 | 0x80 | 0x100
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = set()
+
+    def watch(self, directory):
+        """
+        Start watching a directory, if it isn't already
+        """
+        if directory in self.directories:
+            return
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed for {}'.format(directory))
+        self.directories.add(directory)
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for a change, discarding the events
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        """
+        Stop watching everything
+        """
+        os.close(self.fd)
+
+
+def _inotify():
+    """
+    Return an _Inotify, or None if it isn't available here
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError, TypeError):
+        # No libc, or a libc without inotify
+        return None
+
+
+def _stats(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Watcher:
+    """
+    Reloads modules imported from notebooks when their code cells change
+
+    Call `check` to look for changes once, or `start` to have a background
+    thread do it every time a notebook changes, and at least every `interval`
+    seconds. `callback` is called with the list of reloaded module names after
+    each check that reloaded something.
+
+    Modules imported after the watcher was created are watched from the first
+    check after their import on.
+    """
+    def __init__(self, dependents=False, interval=1.0, callback=None):
+        self.dependents = dependents
+        self.interval = interval
+        self.callback = callback
+        # notebook path -> (stats, source hash) when last checked
+        self._seen = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.check()
+
+    def check(self):
+        """
+        Reload the modules whose notebook's code changed since the last check
+
+        Returns the names of the reloaded modules, in the order they were
+        reloaded. Errors raised by reloading a module are raised from here.
+        """
+        with self._lock:
+            paths = {}
+            for name, path in notebook_modules().items():
+                paths.setdefault(path, []).append(name)
+
+            changed = []
+            for path, names in sorted(paths.items()):
+                stats = _stats(path)
+                seen = self._seen.get(path)
+                if seen is not None and seen[0] == stats:
+                    continue
+                digest = source_hash(path)
+                if digest is None:
+                    # Gone, or half written: look at it again next time
+                    continue
+                self._seen[path] = (stats, digest)
+                if seen is not None and seen[1] != digest:
+                    changed.extend(sorted(names))
+
+            names = [n for n in reload_order(changed, self.dependents) if n in sys.modules]
+            for name in names:
+                importlib.reload(sys.modules[name])
+        if names and self.callback is not None:
+            self.callback(names)
+        return names
+
+    def start(self):
+        """
+        Start checking for changes in a background thread
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ipynb.reload', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread, waiting for it to finish
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        inotify = _inotify()
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    for path in list(self._seen):
+                        try:
+                            inotify.watch(os.path.dirname(path))
+                        except OSError:
+                            pass
+                    inotify.wait(self.interval)
+                else:
+                    self._stop.wait(self.interval)
+                if self._stop.is_set():
+                    return
+                try:
+                    self.check()
+                except Exception:  # pylint: disable=broad-except
+                    # A notebook saved with an error in it shouldn't stop the
+                    # watching, the next save might fix it
+                    traceback.print_exc()
+        finally:
+            if inotify is not None:
+                inotify.close()
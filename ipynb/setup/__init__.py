@@ -4,26 +4,78 @@ Provides helpers to produce python packages sourced from .ipynb files
 from setuptools import PackageFinder
 import os
 import glob
-import json
+from concurrent.futures import ThreadPoolExecutor
+
 from ..utils import code_from_ipynb
+from ..reader import read_notebook_file
+from ..fs.cache import write_atomic
+
+
+def py_path(ipynb):
+    """
+    Return the path of the .py file generated for a notebook
+    """
+    return os.path.splitext(ipynb)[0] + '.py'
+
+
+def convert_notebook(ipynb):
+    """
+    Generate the .py file for a notebook, unless it is already up to date
+
+    It is up to date if it is newer than the notebook, or has the same content
+    as what would be generated. The file is only ever replaced atomically.
+    Returns True if the file was written.
+    """
+    pyfile = py_path(ipynb)
+    try:
+        if os.stat(pyfile).st_mtime >= os.stat(ipynb).st_mtime:
+            return False
+        with open(pyfile, 'rb') as f:
+            existing = f.read()
+    except OSError:
+        existing = None
+
+    data = read_notebook_file(ipynb)
+    code = code_from_ipynb(data, markdown=True).encode('utf-8')
+    if code == existing:
+        return False
+    write_atomic(pyfile, code)
+    return True
+
+
+def convert_notebooks(notebooks, jobs=None):
+    """
+    Generate the .py files for notebooks that need it, with jobs threads
+
+    Returns the list of notebooks whose .py file was written.
+    """
+    notebooks = list(notebooks)
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        written = executor.map(convert_notebook, notebooks)
+        return [ipynb for ipynb, was_written in zip(notebooks, written) if was_written]
 
 
 class IPynbPackageFinder(PackageFinder):
     """
     A setuptools PackageFinder that provides .py files for .ipynb files when packaged
+
+    The .py files are generated once all packages are found, in parallel, and
+    only for notebooks that changed since their .py file was generated.
     """
+    @classmethod
+    def find(cls, where='.', exclude=(), include=('*',)):
+        packages = super().find(where, exclude, include)
+        convert_notebooks(
+            ipynb
+            for package in packages
+            for ipynb in glob.glob(os.path.join(where, *package.split('.'), '*.ipynb'))
+        )
+        return packages
+
     @staticmethod
-    def _looks_like_package(path):
+    def _looks_like_package(path, _package_name=None):
         like_package = os.path.isfile(os.path.join(path, '__init__.py'))
         like_package = like_package or os.path.isfile(os.path.join(path, '__init__.ipynb'))
-        if like_package:
-            ipynbs = glob.glob(os.path.join(path,'*.ipynb'))
-            for ipynb in ipynbs:
-                with open(ipynb) as notebook:
-                    data = json.load(notebook)
-                with open(ipynb.replace('ipynb','py'), 'w') as pyfile:
-                    pyfile.write(code_from_ipynb(data, markdown=True))
-
         return like_package
 
 find_packages = IPynbPackageFinder.find
@@ -3,7 +3,9 @@ Utility functions for dealing with manipulating notebooks.
 
 Try to not put too many things here, nor to re-implement nbformat.
 """
+import re
 import ast
+import hashlib
 
 
 PREAMBLE=\
@@ -21,6 +23,11 @@ ALLOWED_NODES = set([
     ast.ImportFrom
 ])
 
+# Matches lines that could start one of the nodes filter_ast keeps. Used to
+# skip parsing cells that can't contain any of them, so it can have false
+# positives but no false negatives. A ; might hide a statement mid line.
+MAYBE_ALLOWED = re.compile(r'^(?:def|class|import|from)\b|^[^\W\da-z]\w*\s*=|;', re.MULTILINE)
+
 
 def validate_nb(nb):
     """
@@ -69,20 +76,79 @@ def filter_ast(module_ast):
     module_ast.body = [n for n in module_ast.body if node_predicate(n)]
     return module_ast
 
+def maybe_has_definitions(source):
+    """
+    Return False if filter_ast would for sure leave nothing of the given source
+    """
+    return MAYBE_ALLOWED.search(source) is not None
+
+
+def _iter_cell_code(cell):
+    """
+    Generate the code for a given cell, as laid out in the notebook's code
+    """
+    if cell['cell_type'] == 'code':
+        # transform the input to executable Python
+        yield ''.join(cell['source'])
+    if cell['cell_type'] == 'markdown':
+        yield '\n# '
+        yield '# '.join(cell['source'])
+    # We want a blank newline after each cell's output.
+    # And the last line of source doesn't have a newline usually.
+    yield '\n\n'
+
+
+def code_cells(nb):
+    """
+    Generate (line offset, source) for each code cell in a given notebook
+
+    The line offset is the number of lines before the cell's source in the code
+    for the whole notebook.
+    """
+    offset = PREAMBLE.count('\n')
+    for cell in nb['cells']:
+        chunks = list(_iter_cell_code(cell))
+        if cell['cell_type'] == 'code':
+            yield offset, chunks[0]
+        offset += sum(chunk.count('\n') for chunk in chunks)
+
+
+def fingerprint(nb):
+    """
+    Return a hash of what importing a given notebook depends on, as 20 bytes
+
+    That's its language and the code cells' sources. Other cells only count
+    by their number of lines, which the line numbers in the code depend on.
+    Outputs, execution counts and metadata don't count at all, so re-running
+    a notebook doesn't change its fingerprint.
+    """
+    language = nb['metadata'].get('kernelspec', {}).get('language', '')
+    h = hashlib.sha1(repr(language).encode('utf-8'))
+    for cell in nb.get('cells', ()):
+        chunks = list(_iter_cell_code(cell))
+        if cell['cell_type'] == 'code':
+            h.update(b'c' + repr(chunks[0]).encode('utf-8'))
+        else:
+            h.update('o{}'.format(sum(chunk.count('\n') for chunk in chunks)).encode('utf-8'))
+    return h.digest()
+
+
+def iter_code_from_ipynb(nb, markdown=False):
+    """
+    Generate the code for a given notebook, chunk by chunk
+
+    nb is passed in as a dictionary that's a parsed ipynb file. The chunks can be
+    written out to a file as they come, or joined to get the whole code.
+    """
+    yield PREAMBLE
+    for cell in nb['cells']:
+        yield from _iter_cell_code(cell)
+
+
 def code_from_ipynb(nb, markdown=False):
     """
     Get the code for a given notebook
 
     nb is passed in as a dictionary that's a parsed ipynb file
     """
-    code = PREAMBLE
-    for cell in nb['cells']:
-        if cell['cell_type'] == 'code':
-            # transform the input to executable Python
-            code += ''.join(cell['source'])
-        if cell['cell_type'] == 'markdown':
-            code += '\n# ' + '# '.join(cell['source'])
-        # We want a blank newline after each cell's output.
-        # And the last line of source doesn't have a newline usually.
-        code += '\n\n'
-    return code
+    return ''.join(iter_code_from_ipynb(nb, markdown=markdown))
@@ -9,5 +9,5 @@ setup(
     author_email='yuvipanda@gmail.com',
     license='BSD',
     packages=find_packages(),
-    python_requires='>=3.4'
+    python_requires='>=3.8'
 )
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import importlib
+
+import pytest
+
+from ipynb.fs import prefetch
+
+
+def make_notebook(cells, language='python'):
+    """
+    Return the JSON for a nbformat 4 notebook with the given cells
+
+    Each cell is either a string (a code cell) or a (cell_type, source) tuple.
+    """
+    nb_cells = []
+    for cell in cells:
+        cell_type, source = ('code', cell) if isinstance(cell, str) else cell
+        nb_cell = {
+            'cell_type': cell_type,
+            'metadata': {},
+            'source': source.splitlines(True),
+        }
+        if cell_type == 'code':
+            nb_cell['execution_count'] = None
+            nb_cell['outputs'] = []
+        nb_cells.append(nb_cell)
+    return json.dumps({
+        'cells': nb_cells,
+        'metadata': {
+            'kernelspec': {'display_name': 'Python 3', 'language': language, 'name': 'python3'},
+        },
+        'nbformat': 4,
+        'nbformat_minor': 2,
+    }, indent=1)
+
+
+class NotebookDir:
+    """
+    A temporary directory on sys.path to write notebooks into
+    """
+    def __init__(self, path):
+        self.path = str(path)
+
+    def write(self, name, cells, **kwargs):
+        """
+        Write a notebook at name (relative, without the .ipynb suffix)
+        """
+        path = os.path.join(self.path, *name.split('/')) + '.ipynb'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(make_notebook(cells, **kwargs))
+        importlib.invalidate_caches()
+        return path
+
+    def forget(self):
+        """
+        Drop all the modules imported from this directory from sys.modules
+        """
+        for name, module in list(sys.modules.items()):
+            origin = getattr(getattr(module, '__spec__', None), 'origin', None)
+            if (origin or '').startswith(self.path):
+                del sys.modules[name]
+
+
+@pytest.fixture
+def nbdir(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    d = NotebookDir(tmp_path)
+    yield d
+    # Nothing left loading in the background for the next test
+    prefetch.wait()
+    d.forget()
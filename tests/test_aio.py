@@ -0,0 +1,106 @@
+import sys
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ipynb.aio import import_notebook
+from ipynb.fs.full import FullLoader
+
+
+def test_import_notebook(nbdir):
+    nbdir.write('aio_pkg/__init__', ['import threading\nTHREAD = threading.get_ident()'])
+    nbdir.write('aio_pkg/mod', ['import threading\nTHREAD = threading.get_ident()', 'def f():\n    return 1'])
+
+    async def main():
+        return await import_notebook('ipynb.fs.full.aio_pkg.mod'), threading.get_ident()
+
+    module, loop_thread = asyncio.run(main())
+    assert module is sys.modules['ipynb.fs.full.aio_pkg.mod']
+    assert module.f() == 1
+    # Executed on the loop's thread, after the parent package
+    assert module.THREAD == loop_thread
+    assert sys.modules['ipynb.fs.full.aio_pkg'].THREAD == loop_thread
+
+
+def test_gather_compiles_once(nbdir, monkeypatch):
+    monkeypatch.setattr('sys.dont_write_bytecode', True)
+    for i in range(4):
+        nbdir.write('aio_many_{}'.format(i), ['X = {}'.format(i)])
+    compiled = []
+    real_code_from_notebook = FullLoader.code_from_notebook
+    def code_from_notebook(self, nb):
+        compiled.append(threading.get_ident())
+        return real_code_from_notebook(self, nb)
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', code_from_notebook)
+
+    async def main():
+        names = ['ipynb.fs.full.aio_many_{}'.format(i % 4) for i in range(12)]
+        with ThreadPoolExecutor(4) as executor:
+            return await asyncio.gather(*(import_notebook(name, executor) for name in names)), threading.get_ident()
+
+    modules, loop_thread = asyncio.run(main())
+    assert [m.X for m in modules] == [i % 4 for i in range(12)]
+    assert len(compiled) == 4
+    assert loop_thread not in compiled
+
+
+def test_import_error(nbdir):
+    nbdir.write('aio_broken', ['x = '])
+
+    async def main():
+        try:
+            await import_notebook('ipynb.fs.defs.aio_missing')
+        except ImportError:
+            pass
+        else:
+            raise AssertionError('missing notebook imported')
+        try:
+            await import_notebook('ipynb.fs.full.aio_broken')
+        except SyntaxError:
+            pass
+        else:
+            raise AssertionError('broken notebook imported')
+
+    asyncio.run(main())
+
+
+def test_process_pool(nbdir, monkeypatch):
+    monkeypatch.setattr('sys.dont_write_bytecode', True)
+    nbdir.write('aio_process', ['Y = 2'])
+
+    def fail(*args):
+        raise AssertionError('compiled in the main process')
+
+    async def main():
+        with ProcessPoolExecutor(1) as executor:
+            # Start the worker before failing compiles in this process
+            executor.submit(int).result()
+            monkeypatch.setattr(FullLoader, 'code_from_notebook', fail)
+            return await import_notebook('ipynb.fs.full.aio_process', executor)
+
+    module = asyncio.run(main())
+    assert module.Y == 2
+
+
+def test_process_pool_per_cell(nbdir, monkeypatch):
+    monkeypatch.setattr('ipynb.config.per_cell', True)
+    nbdir.write('aio_cells', ['Z = 3'])
+    compiled = []
+
+    def fail(*args):
+        raise AssertionError('whole notebook compiled')
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', fail)
+    real_code_from_cell = FullLoader.code_from_cell
+    def code_from_cell(self, source):
+        compiled.append(threading.get_ident())
+        return real_code_from_cell(self, source)
+    monkeypatch.setattr(FullLoader, 'code_from_cell', code_from_cell)
+
+    async def main():
+        with ProcessPoolExecutor(1) as executor:
+            return await import_notebook('ipynb.fs.full.aio_cells', executor), threading.get_ident()
+
+    module, loop_thread = asyncio.run(main())
+    assert module.Z == 3
+    # The cells were compiled ahead of the import, in the default executor
+    assert compiled and loop_thread not in compiled
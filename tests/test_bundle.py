@@ -0,0 +1,130 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+from ipynb import pack
+from ipynb.fs.bundle import Bundle
+from ipynb.fs.finder import FSFinder, finder, add_bundle
+from ipynb.fs.full import FullLoader
+from ipynb.fs.defs import FilteredLoader
+from conftest import make_notebook
+
+
+def write_tree(directory, modules):
+    """
+    Write {relative path: cells, or .py source} under directory
+    """
+    for relpath, contents in modules.items():
+        path = os.path.join(str(directory), *relpath.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(make_notebook(contents) if relpath.endswith('.ipynb') else contents)
+
+
+@pytest.fixture
+def bundled(tmp_path, monkeypatch):
+    """
+    Return a function packing a tree of notebooks into a bundle added to the finder
+    """
+    monkeypatch.setattr(finder, 'bundles', [])
+    paths = []
+
+    def write(modules, name='tree'):
+        tree = tmp_path / name
+        write_tree(tree, modules)
+        path = str(tmp_path / (name + '.nbb'))
+        assert all(not errors for _, errors in pack.pack(path, [str(tree)]))
+        add_bundle(path)
+        paths.append(path)
+        return path
+
+    yield write
+    for name, module in list(sys.modules.items()):
+        origin = getattr(getattr(module, '__spec__', None), 'origin', None) or ''
+        if any(origin.startswith(path) for path in paths):
+            del sys.modules[name]
+
+
+def test_find_modules(tmp_path):
+    write_tree(tmp_path, {
+        'a.ipynb': ['x = 1'],
+        'a.py': 'x = 2',
+        'pkg/__init__.ipynb': [],
+        'pkg/__init__.py': '',
+        'pkg/b.py': '',
+        'not-a-module.ipynb': [],
+        '__init__.py': '',
+    })
+    assert pack.find_modules(str(tmp_path)) == {
+        'a': str(tmp_path / 'a.ipynb'),
+        'pkg': str(tmp_path / 'pkg' / '__init__.ipynb'),
+        'pkg.b': str(tmp_path / 'pkg' / 'b.py'),
+    }
+
+
+def test_import_from_bundle(bundled, monkeypatch):
+    path = bundled({
+        'bd_nb.ipynb': ['x = 1', 'def f():\n    return x'],
+        'bd_pkg/__init__.ipynb': ['X = 2'],
+        'bd_pkg/sub.ipynb': ['Y = 3\ny = 4'],
+        'bd_pkg/plain.py': 'Z = 5',
+    })
+
+    def fail(*args):
+        raise AssertionError('not loaded from the bundle')
+    monkeypatch.setattr(FSFinder, '_find_path', fail)
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', fail)
+    monkeypatch.setattr(FilteredLoader, 'code_from_notebook', fail)
+
+    full = importlib.import_module('ipynb.fs.full.bd_nb')
+    assert full.f() == 1
+    assert full.__spec__.origin == os.path.join(path, 'bd_nb.ipynb')
+    assert not hasattr(importlib.import_module('ipynb.fs.defs.bd_nb'), 'x')
+    assert importlib.import_module('ipynb.fs.full.bd_pkg').X == 2
+    sub = importlib.import_module('ipynb.fs.defs.bd_pkg.sub')
+    assert sub.Y == 3
+    assert not hasattr(sub, 'y')
+    assert importlib.import_module('ipynb.fs.full.bd_pkg.plain').Z == 5
+
+
+def test_bundle_before_sys_path(bundled, nbdir):
+    nbdir.write('bd_first', ['WHERE = "sys.path"'])
+    bundled({'bd_first.ipynb': ['WHERE = "bundle"']})
+    assert importlib.import_module('ipynb.fs.full.bd_first').WHERE == 'bundle'
+
+
+def test_code_for_another_python(bundled, monkeypatch):
+    bundled({'bd_compiled.ipynb': ['Y = 2']})
+    finder.bundles[0].has_code = False
+    compiled = []
+    real_code_from_notebook = FullLoader.code_from_notebook
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', lambda self, nb: compiled.append(1) or real_code_from_notebook(self, nb))
+    assert importlib.import_module('ipynb.fs.full.bd_compiled').Y == 2
+    assert compiled == [1]
+
+
+def test_fingerprints(bundled, tmp_path):
+    path = bundled({'bd_a.ipynb': ['x = 1'], 'bd_b.ipynb': ['x = 1', ('markdown', 'Other')]})
+    modules = Bundle(path).modules
+    assert modules['bd_a'].fingerprint != modules['bd_b'].fingerprint
+    assert {'full', 'defs'} <= set(modules['bd_a'].codes)
+
+
+def test_not_a_bundle(tmp_path):
+    path = str(tmp_path / 'nothing.nbb')
+    with open(path, 'wb') as f:
+        f.write(b'PK\x03\x04' + b'\0' * 64)
+    with pytest.raises(ValueError):
+        Bundle(path)
+
+
+def test_main(tmp_path, capsys):
+    write_tree(tmp_path / 'tree', {'ok.ipynb': ['x = 1'], 'broken.ipynb': ['x = ']})
+    output = str(tmp_path / 'out.nbb')
+    assert pack.main(['-q', '-o', output, str(tmp_path / 'tree')]) == 1
+    assert 'broken.ipynb (full)' in capsys.readouterr().err
+    modules = Bundle(output).modules
+    assert set(modules) == {'ok', 'broken'}
+    assert 'full' not in modules['broken'].codes
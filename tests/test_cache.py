@@ -0,0 +1,135 @@
+import os
+import json
+import importlib
+
+import pytest
+
+from ipynb.fs import cache
+from ipynb.fs.full import FullLoader
+from ipynb.fs.defs import FilteredLoader
+from ipynb.fs.loader import _codes
+from ipynb.reader import read_notebook
+from ipynb.utils import fingerprint
+
+
+@pytest.fixture(autouse=True)
+def write_bytecode(monkeypatch):
+    monkeypatch.setattr('sys.dont_write_bytecode', False)
+
+
+def test_cache_written(nbdir):
+    path = nbdir.write('cached', ['x = 1', 'def f():\n    return x'])
+    mod = importlib.import_module('ipynb.fs.full.cached')
+    assert mod.f() == 1
+    assert os.path.exists(cache.cache_path(path, 'full'))
+    assert not os.path.exists(cache.cache_path(path, 'defs'))
+
+
+def test_warm_import_skips_parsing(nbdir, monkeypatch):
+    nbdir.write('warm', ['x = 1'])
+    assert importlib.import_module('ipynb.fs.full.warm').x == 1
+    nbdir.forget()
+
+    def fail(*args):
+        raise AssertionError('notebook parsed on a warm import')
+    monkeypatch.setattr(FullLoader, 'load_notebook', fail)
+    assert importlib.import_module('ipynb.fs.full.warm').x == 1
+
+
+def test_loaded_code_not_kept(nbdir):
+    path = nbdir.write('not_kept', ['x = 1'])
+    loader = FullLoader('ipynb.fs.full.not_kept', path)
+    loader.warm(loader.name)
+    assert (path, 'full') in _codes
+    importlib.import_module('ipynb.fs.full.not_kept')
+    assert (path, 'full') not in _codes
+
+
+def test_flavors_cached_separately(nbdir):
+    nbdir.write('flavors', ['x = 1', 'Y = 2'])
+    full = importlib.import_module('ipynb.fs.full.flavors')
+    defs = importlib.import_module('ipynb.fs.defs.flavors')
+    assert full.x == 1
+    assert not hasattr(defs, 'x')
+    assert defs.Y == 2
+
+
+def test_changed_notebook_recompiled(nbdir):
+    path = nbdir.write('changing', ['x = 1'])
+    assert importlib.import_module('ipynb.fs.defs.changing')
+    nbdir.forget()
+    nbdir.write('changing', ['X = 2'])
+    # Make sure the stats differ even on filesystems with coarse mtimes
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    assert importlib.import_module('ipynb.fs.defs.changing').X == 2
+
+
+def test_dont_write_bytecode(nbdir, monkeypatch):
+    monkeypatch.setattr('sys.dont_write_bytecode', True)
+    path = nbdir.write('nowrite', ['x = 1'])
+    assert importlib.import_module('ipynb.fs.full.nowrite').x == 1
+    assert not os.path.exists(cache.cache_path(path, 'full'))
+
+
+def test_corrupt_cache_ignored(nbdir):
+    path = nbdir.write('corrupt', ['x = 1'])
+    loader = FilteredLoader('ipynb.fs.defs.corrupt', path)
+    loader.get_code('ipynb.fs.defs.corrupt')
+    with open(cache.cache_path(path, 'defs'), 'r+b') as f:
+        f.truncate(30)
+    stats = loader.path_stats(path)
+    assert cache.load_code(path, 'defs', stats) is None
+    assert loader.get_code('ipynb.fs.defs.corrupt') is not None
+
+
+def rerun(path):
+    """
+    Change the outputs & execution counts of the notebook, and its stats
+    """
+    with open(path) as f:
+        nb = json.load(f)
+    for cell in nb['cells']:
+        if cell['cell_type'] == 'code':
+            cell['execution_count'] = 1
+            cell['outputs'] = [{'output_type': 'stream', 'name': 'stdout', 'text': ['hello\n']}]
+    with open(path, 'w') as f:
+        json.dump(nb, f)
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+
+def test_fingerprint_ignores_outputs(nbdir):
+    path = nbdir.write('fp', ['x = 1', ('markdown', 'Title')])
+    with open(path, 'rb') as f:
+        before = fingerprint(read_notebook(f.read()))
+    rerun(path)
+    with open(path, 'rb') as f:
+        assert fingerprint(read_notebook(f.read())) == before
+
+
+def test_fingerprint_counts_lines_of_other_cells():
+    nb = {'metadata': {}, 'cells': [{'cell_type': 'markdown', 'source': ['Title']}, {'cell_type': 'code', 'source': ['x = 1']}]}
+    before = fingerprint(nb)
+    nb['cells'][0]['source'] = ['Other title']
+    assert fingerprint(nb) == before
+    nb['cells'][0]['source'] = ['Title\n', 'More']
+    assert fingerprint(nb) != before
+
+
+def test_rerun_notebook_not_recompiled(nbdir, monkeypatch):
+    path = nbdir.write('rerun', ['x = 1'])
+    assert importlib.import_module('ipynb.fs.full.rerun').x == 1
+    nbdir.forget()
+    rerun(path)
+
+    def fail(*args):
+        raise AssertionError('notebook compiled again')
+    with monkeypatch.context() as m:
+        m.setattr(FullLoader, 'code_from_notebook', fail)
+        assert importlib.import_module('ipynb.fs.full.rerun').x == 1
+    nbdir.forget()
+
+    # The new stats were written back, so it isn't even parsed anymore
+    monkeypatch.setattr(FullLoader, 'load_notebook', fail)
+    assert importlib.import_module('ipynb.fs.full.rerun').x == 1
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from ipynb import compileall
+from ipynb.fs import cache
+from ipynb.fs.full import FullLoader
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_compileall(nbdir, jobs):
+    paths = [
+        nbdir.write('top', ['x = 1']),
+        nbdir.write('pkg/__init__', ['X = 1']),
+        nbdir.write('pkg/sub/mod', ['def f():\n    pass']),
+    ]
+    skipped = nbdir.write('pkg/not importable', ['x = 1'])
+    checkpoint = nbdir.write('pkg/.ipynb_checkpoints/mod-checkpoint', ['x = 1'])
+
+    assert compileall.main(['-q', '-j', str(jobs), nbdir.path]) == 0
+    for path in paths:
+        for flavor in ('full', 'defs'):
+            stats = FullLoader('', path).path_stats(path)
+            assert cache.load_code(path, flavor, stats) is not None
+    for path in (skipped, checkpoint):
+        assert not os.path.exists(cache.cache_path(path, 'full'))
+
+
+def test_flavor_and_errors(nbdir, capsys):
+    good = nbdir.write('good', ['x = 1'])
+    bad = nbdir.write('bad', ['x = 1'], language='R')
+    assert compileall.main(['--flavor', 'defs', good, bad]) == 1
+    assert os.path.exists(cache.cache_path(good, 'defs'))
+    assert not os.path.exists(cache.cache_path(good, 'full'))
+    assert 'bad.ipynb (defs): Could not import' in capsys.readouterr().err
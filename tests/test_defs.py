@@ -1,5 +1,13 @@
+import os
+import ast
 import pytest
 import importlib
+from collections import OrderedDict
+
+import ipynb.fs.defs
+from ipynb.fs.defs import FilteredLoader
+from ipynb.reader import read_notebook
+from ipynb.utils import code_from_ipynb, filter_ast, maybe_has_definitions
 
 
 @pytest.fixture(
@@ -49,3 +57,73 @@ def test_r_notebook():
 def test_nbformat_2():
     with pytest.raises(ImportError):
         import ipynb.fs.defs.older_nbformat
+
+@pytest.mark.parametrize('source, expected', [
+    ('x = 1\nprint(x)', False),
+    ('df.plot()\nfor i in range(3):\n    import os', False),
+    ('A = 1', True),
+    ('x = 1; import os', True),
+    ('@decorator\ndef f():\n    pass', True),
+    ('class A:\n    pass', True),
+    ('from os import path', True),
+    ('ÉTAT = 1', True),
+])
+def test_maybe_has_definitions(source, expected):
+    assert maybe_has_definitions(source) == expected
+    if not expected:
+        assert filter_ast(ast.parse(source)).body == []
+
+def test_same_code_as_whole_notebook():
+    path = os.path.join(os.path.dirname(__file__), 'pure_ipynb', 'foo.ipynb')
+    with open(path, 'rb') as f:
+        nb = read_notebook(f.read())
+    loader = FilteredLoader('ipynb.fs.defs.pure_ipynb.foo', path)
+    whole = filter_ast(ast.parse(code_from_ipynb(nb)))
+    incremental = compile(whole, path, 'exec')
+    assert loader.code_from_notebook(nb).co_code == incremental.co_code
+    assert list(loader.code_from_notebook(nb).co_lines()) == list(incremental.co_lines())
+
+def test_unchanged_cells_not_parsed_again(nbdir, monkeypatch):
+    path = nbdir.write('reparse', ['def f():\n    return 1', 'X = 2', 'y = 3'])
+    loader = FilteredLoader('ipynb.fs.defs.reparse', path)
+    loader.code_from_notebook(loader.load_notebook('ipynb.fs.defs.reparse'))
+    nbdir.write('reparse', ['def f():\n    return 1', 'X = 3', 'y = 3'])
+
+    parsed = []
+    real_parse = ast.parse
+    def parse(source, *args, **kwargs):
+        parsed.append(source)
+        return real_parse(source, *args, **kwargs)
+    monkeypatch.setattr(ast, 'parse', parse)
+    code = loader.code_from_notebook(loader.load_notebook('ipynb.fs.defs.reparse'))
+    # Parsed after blank lines standing for the lines before the cell
+    assert [source.lstrip('\n') for source in parsed] == ['X = 3']
+    namespace = {}
+    exec(code, namespace)
+    assert (namespace['f'](), namespace['X']) == (1, 3)
+    assert 'y' not in namespace
+
+def test_filtered_cells_bounded(nbdir, monkeypatch):
+    monkeypatch.setattr('ipynb.fs.defs._filtered_cells', OrderedDict())
+    monkeypatch.setattr('ipynb.fs.defs.FILTERED_CACHE_SIZE', 50)
+    for name in ('bounded_a', 'bounded_b'):
+        path = nbdir.write(name, ['def {}():\n    return 1'.format(name) + ' ' * 20, 'x = 1'])
+        loader = FilteredLoader('ipynb.fs.defs.' + name, path)
+        loader.filtered_body(loader.load_notebook(loader.name))
+    assert list(ipynb.fs.defs._filtered_cells) == [path]
+
+def test_syntax_error_line(nbdir):
+    nbdir.write('broken', ['def f():\n    return 1', 'X = (1'])
+    with pytest.raises(SyntaxError) as e:
+        import ipynb.fs.defs.broken
+    assert e.value.lineno == 9
+
+def test_line_numbers_after_cells_move(nbdir):
+    cells = ['def f():\n    return 1', 'def f():\n    return 1']
+    path = nbdir.write('moving', cells)
+    loader = FilteredLoader('ipynb.fs.defs.moving', path)
+    body = loader.filtered_body(loader.load_notebook(loader.name))
+    assert [n.lineno for n in body] == [6, 9]
+    nbdir.write('moving', ['x = 1\ny = 2'] + cells)
+    body = loader.filtered_body(loader.load_notebook(loader.name))
+    assert [n.lineno for n in body] == [9, 12]
@@ -0,0 +1,105 @@
+import os
+import sys
+import zipfile
+import importlib
+
+from ipynb.fs.finder import FSFinder
+from ipynb.fs.full import FullLoader
+
+
+def test_find_spec(nbdir):
+    path = nbdir.write('pkg/__init__', ['X = 1'])
+    nbdir.write('pkg/mod', ['Y = 2'])
+    finder = FSFinder('ipynb.fs.full', FullLoader)
+    spec = finder.find_spec('ipynb.fs.full.pkg', None)
+    assert spec.origin == path
+    assert spec.submodule_search_locations is not None
+    spec = finder.find_spec('ipynb.fs.full.pkg.mod', None)
+    assert spec.origin == os.path.join(nbdir.path, 'pkg', 'mod.ipynb')
+    assert spec.submodule_search_locations is None
+    assert finder.find_spec('ipynb.fs.full.pkg.missing', None) is None
+    assert finder.find_spec('something.else', None) is None
+
+
+def test_ipynb_preferred_over_py(nbdir):
+    nbdir.write('both', ['X = 1'])
+    with open(os.path.join(nbdir.path, 'both.py'), 'w') as f:
+        f.write('X = 2\n')
+    finder = FSFinder('ipynb.fs.full', FullLoader)
+    assert finder.find_spec('ipynb.fs.full.both', None).origin.endswith('both.ipynb')
+
+
+def test_listings_cached(nbdir, monkeypatch):
+    nbdir.write('listed', ['X = 1'])
+    finder = FSFinder('ipynb.fs.full', FullLoader)
+    assert finder.find_spec('ipynb.fs.full.listed', None) is not None
+
+    calls = []
+    real_listdir = os.listdir
+    def listdir(path):
+        calls.append(path)
+        return real_listdir(path)
+    monkeypatch.setattr(os, 'listdir', listdir)
+    assert finder.find_spec('ipynb.fs.full.listed', None) is not None
+    assert finder.find_spec('ipynb.fs.full.missing', None) is None
+    assert nbdir.path not in calls
+
+
+def test_new_files_found_after_invalidate_caches(nbdir):
+    finder = FSFinder('ipynb.fs.full', FullLoader)
+    assert finder.find_spec('ipynb.fs.full.late', None) is None
+    nbdir.write('late', ['X = 1'])
+    finder.invalidate_caches()
+    assert finder.find_spec('ipynb.fs.full.late', None) is not None
+
+
+def test_import_after_invalidate_caches(nbdir):
+    nbdir.write('fresh', ['X = 1'])
+    importlib.invalidate_caches()
+    assert importlib.import_module('ipynb.fs.full.fresh').X == 1
+
+
+def test_single_meta_path_entry():
+    import ipynb.fs.full
+    import ipynb.fs.defs
+    from ipynb.fs import finder
+    assert [f for f in sys.meta_path if isinstance(f, FSFinder)] == [finder.finder]
+    assert set(finder.finder.flavors) >= {'ipynb.fs.full', 'ipynb.fs.defs'}
+
+
+def test_other_modules_rejected(monkeypatch):
+    from ipynb.fs import finder
+    def fail(*args):
+        raise AssertionError('looked for a module that is not ours')
+    monkeypatch.setattr(finder.FSFinder, '_find_path', fail)
+    assert finder.finder.find_spec('json.decoder', None) is None
+    assert finder.finder.find_spec('ipynb.utils', None) is None
+    assert finder.finder.find_spec('ipynb.fs.full', None) is None
+
+
+def test_register_flavor(nbdir, monkeypatch):
+    from ipynb.fs import finder
+
+    class UpperLoader(FullLoader):
+        flavor = 'upper'
+    monkeypatch.setattr(finder.finder, 'flavors', dict(finder.finder.flavors))
+
+    nbdir.write('flavored', ['X = 1'])
+    finder.register('ipynb.fs.upper', UpperLoader)
+    spec = finder.finder.find_spec('ipynb.fs.upper.flavored', None)
+    assert isinstance(spec.loader, UpperLoader)
+    assert isinstance(finder.finder.find_spec('ipynb.fs.full.flavored', None).loader, FullLoader)
+
+
+def test_sys_path_order_with_archives(nbdir, tmp_path_factory, monkeypatch):
+    from conftest import make_notebook
+    nbdir.write('ordered', ['X = "directory"'])
+    archive = str(tmp_path_factory.mktemp('archives') / 'ordered.zip')
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('ordered.ipynb', make_notebook(['X = "archive"']))
+    monkeypatch.syspath_prepend(archive)
+    finder = FSFinder('ipynb.fs.full', FullLoader)
+    assert finder.find_spec('ipynb.fs.full.ordered', None).origin.startswith(archive)
+    sys.path.remove(archive)
+    sys.path.append(archive)
+    assert finder.find_spec('ipynb.fs.full.ordered', None).origin.startswith(nbdir.path)
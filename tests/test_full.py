@@ -45,3 +45,26 @@ def test_r_notebook():
 def test_nbformat_2():
     with pytest.raises(ImportError):
         import ipynb.fs.full.older_nbformat
+
+def test_big_notebook_mapped(nbdir, monkeypatch):
+    import mmap
+    from ipynb.fs import loader
+    nbdir.write('mapped', ['x = "é"'])
+    seen = []
+    real_read_notebook = loader.read_notebook
+    def read_notebook(data):
+        seen.append(type(data))
+        return real_read_notebook(data)
+    monkeypatch.setattr(loader, 'read_notebook', read_notebook)
+    monkeypatch.setattr(loader, 'SMALL_NOTEBOOK', 0)
+    assert importlib.import_module('ipynb.fs.full.mapped').x == 'é'
+    assert seen == [mmap.mmap]
+
+def test_empty_notebook(nbdir, monkeypatch):
+    from ipynb.fs import loader
+    path = nbdir.write('empty', [])
+    open(path, 'w').close()
+    for threshold in (0, loader.SMALL_NOTEBOOK):
+        monkeypatch.setattr(loader, 'SMALL_NOTEBOOK', threshold)
+        with pytest.raises(ImportError, match='not a valid ipynb file'):
+            importlib.import_module('ipynb.fs.full.empty')
@@ -0,0 +1,55 @@
+import json
+import importlib
+
+import pytest
+
+from ipynb import instrument
+
+
+@pytest.fixture(autouse=True)
+def instrumented():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def test_report(nbdir):
+    nbdir.write('inst_child', ['def f():\n    return 1'])
+    nbdir.write('inst_parent', ['import ipynb.fs.defs.inst_child', 'x = 1'])
+    importlib.import_module('ipynb.fs.full.inst_parent')
+
+    report = instrument.report()
+    json.dumps(report)
+    [parent] = [r for r in report if r['name'] == 'ipynb.fs.full.inst_parent']
+    phases = parent['phases']
+    assert {'find', 'cache', 'read', 'parse', 'assemble', 'compile', 'exec'} <= set(phases)
+    assert phases['find']['paths'] >= 1
+    assert phases['find']['stats'] >= 1
+    assert phases['parse']['cells'] == 2
+    assert phases['read']['bytes'] > 0
+
+    [child] = parent['children']
+    assert child['name'] == 'ipynb.fs.defs.inst_child'
+    assert child['phases']['filter']['nodes'] == 1
+    assert parent['seconds'] >= child['seconds']
+    assert parent['self_seconds'] == pytest.approx(parent['seconds'] - child['seconds'])
+
+
+def test_format_tree(nbdir):
+    nbdir.write('inst_tree_child', ['x = 1'])
+    nbdir.write('inst_tree', ['import ipynb.fs.full.inst_tree_child'])
+    importlib.import_module('ipynb.fs.full.inst_tree')
+    lines = instrument.format_tree().splitlines()
+    assert lines[0] == 'ipynb import time: self [us] | cumulative | module'
+    [parent] = [l for l in lines if l.split('|')[2].startswith(' ipynb.fs.full.inst_tree ')]
+    [child] = [l for l in lines if l.split('|')[2].startswith('   ipynb.fs.full.inst_tree_child ')]
+    assert lines.index(child) == lines.index(parent) + 1
+
+
+def test_disabled(nbdir):
+    instrument.disable()
+    nbdir.write('inst_off', ['x = 1'])
+    importlib.import_module('ipynb.fs.full.inst_off')
+    assert instrument.report() == []
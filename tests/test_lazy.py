@@ -0,0 +1,82 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+from ipynb import config
+
+
+@pytest.fixture(autouse=True)
+def lazy_defs(monkeypatch, nbdir):
+    monkeypatch.setattr(config, 'lazy_defs', True)
+    with open(os.path.join(nbdir.path, 'lazy_heavy.py'), 'w') as f:
+        f.write('VALUE = 42\n')
+    yield
+    sys.modules.pop('lazy_heavy', None)
+
+
+def test_definitions_executed_on_access(nbdir):
+    nbdir.write('lazy_nb', [
+        'import lazy_heavy',
+        'def light():\n    return 1',
+        'def heavy():\n    return lazy_heavy.VALUE + CONSTANT',
+        'CONSTANT = 1',
+        'not_kept = 2',
+    ])
+    mod = importlib.import_module('ipynb.fs.defs.lazy_nb')
+    assert 'light' not in vars(mod)
+    assert mod.light() == 1
+    assert 'lazy_heavy' not in sys.modules
+
+    from ipynb.fs.defs.lazy_nb import heavy
+    assert 'lazy_heavy' in sys.modules
+    assert heavy() == 43
+    assert not hasattr(mod, 'not_kept')
+
+
+def test_dir_and_all(nbdir):
+    nbdir.write('lazy_dir', ['import lazy_heavy as _h', 'def f():\n    pass', 'class A:\n    pass', 'x = 1'])
+    mod = importlib.import_module('ipynb.fs.defs.lazy_dir')
+    assert {'f', 'A', '_h'} <= set(dir(mod))
+    assert mod.__all__ == ['A', 'f']
+    assert 'lazy_heavy' not in sys.modules
+
+
+def test_redefinitions(nbdir):
+    nbdir.write('lazy_redef', [
+        'def g():\n    return 1',
+        'def f():\n    return g()',
+        'def g():\n    return 2',
+        'X = Y = 1',
+        'Y = 2',
+    ])
+    mod = importlib.import_module('ipynb.fs.defs.lazy_redef')
+    assert mod.f() == 2
+    assert mod.X == 1
+    assert mod.Y == 2
+
+
+def test_rebinding_independent_of_access_order(nbdir):
+    cells = ['A = 1', 'B = A + 1', 'C = A + 2', 'A = 5']
+    nbdir.write('lazy_order', cells)
+    mod = importlib.import_module('ipynb.fs.defs.lazy_order')
+    assert (mod.A, mod.B, mod.C) == (5, 2, 3)
+
+    nbdir.write('lazy_order_reversed', cells)
+    mod = importlib.import_module('ipynb.fs.defs.lazy_order_reversed')
+    assert (mod.C, mod.B, mod.A) == (3, 2, 5)
+
+
+def test_star_import_is_eager(nbdir):
+    nbdir.write('lazy_star', ['from lazy_heavy import *', 'def f():\n    return VALUE'])
+    mod = importlib.import_module('ipynb.fs.defs.lazy_star')
+    assert 'lazy_heavy' in sys.modules
+    assert mod.f() == 42
+
+
+def test_missing_attribute(nbdir):
+    nbdir.write('lazy_missing', ['def f():\n    pass'])
+    mod = importlib.import_module('ipynb.fs.defs.lazy_missing')
+    with pytest.raises(AttributeError):
+        mod.nope
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import importlib
+
+import pytest
+
+from ipynb import manifest
+from ipynb.fs.finder import FSFinder, finder
+from ipynb.fs.full import FullLoader
+
+
+@pytest.fixture(autouse=True)
+def forget_seeds(monkeypatch):
+    monkeypatch.setattr(finder, '_known', {})
+
+
+@pytest.fixture
+def recorded(nbdir, tmp_path):
+    """
+    Import a few notebooks while recording, returning the manifest's path
+    """
+    nbdir.write('mf_pkg/__init__', ['X = 1'])
+    nbdir.write('mf_pkg/helper', ['def f():\n    return 2'])
+    nbdir.write('mf_main', ['from ipynb.fs.defs.mf_pkg.helper import f', 'Y = f()'])
+    manifest.start()
+    try:
+        importlib.import_module('ipynb.fs.full.mf_main')
+        importlib.import_module('ipynb.fs.full.mf_main')
+    finally:
+        path = str(tmp_path / 'manifest.json')
+        manifest.save(path)
+        manifest.stop()
+    nbdir.forget()
+    return path
+
+
+def test_record(nbdir, recorded):
+    assert manifest.load(recorded) == [
+        {'name': 'ipynb.fs.full.mf_main', 'path': os.path.join(nbdir.path, 'mf_main.ipynb'), 'flavor': 'full'},
+        {'name': 'ipynb.fs.defs.mf_pkg', 'path': os.path.join(nbdir.path, 'mf_pkg', '__init__.ipynb'), 'flavor': 'defs'},
+        {'name': 'ipynb.fs.defs.mf_pkg.helper', 'path': os.path.join(nbdir.path, 'mf_pkg', 'helper.ipynb'), 'flavor': 'defs'},
+    ]
+    assert manifest.entries() == []
+
+
+def test_preload(nbdir, recorded, monkeypatch):
+    modules = manifest.preload(recorded, jobs=2)
+    assert len(modules) == 3
+
+    def fail(*args):
+        raise AssertionError('not preloaded')
+    monkeypatch.setattr(FSFinder, '_find_path', fail)
+    monkeypatch.setattr(FullLoader, 'load_notebook', fail)
+    monkeypatch.setattr(FullLoader, 'load_cached_code', fail)
+    assert importlib.import_module('ipynb.fs.full.mf_main').Y == 2
+
+
+def test_preload_and_import(nbdir, recorded):
+    manifest.preload(recorded, jobs=1, import_modules=True)
+    assert sys.modules['ipynb.fs.full.mf_main'].Y == 2
+
+
+def test_bad_entry_skipped(nbdir, recorded):
+    with open(recorded) as f:
+        saved = json.load(f)
+    # From a flavor that isn't there anymore
+    saved['modules'].insert(0, {'name': 'ipynb.fs.gone.mf_main', 'path': saved['modules'][0]['path'], 'flavor': 'gone'})
+    with open(recorded, 'w') as f:
+        json.dump(saved, f)
+    manifest.preload(recorded, jobs=1)
+    assert importlib.import_module('ipynb.fs.full.mf_main').Y == 2
+
+
+def test_moved_notebook(nbdir, recorded):
+    manifest.preload(recorded)
+    os.rename(os.path.join(nbdir.path, 'mf_main.ipynb'), os.path.join(nbdir.path, 'mf_moved.ipynb'))
+    importlib.invalidate_caches()
+    with pytest.raises(ImportError):
+        importlib.import_module('ipynb.fs.full.mf_main')
+    assert importlib.import_module('ipynb.fs.full.mf_moved').Y == 2
+
+
+def test_not_a_manifest(tmp_path):
+    path = str(tmp_path / 'other.json')
+    with open(path, 'w') as f:
+        f.write('{"modules": []}')
+    with pytest.raises(ValueError):
+        manifest.load(path)
@@ -0,0 +1,189 @@
+import os
+import importlib
+
+import pytest
+
+from ipynb import config
+from ipynb.fs import memo
+from ipynb.fs.loader import importers
+
+from conftest import NotebookDir
+
+
+@pytest.fixture(autouse=True)
+def memoizing(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'memoize_cells', True)
+    monkeypatch.setattr(config, 'memo_dir', str(tmp_path / 'memo'))
+
+
+@pytest.fixture
+def log(tmp_path):
+    """
+    Return a function giving the source of a cell logging its name when run
+    """
+    path = str(tmp_path / 'log')
+
+    def cell(name, source):
+        return 'open({path!r}, "a").write({name!r} + "\\n")\n{source}'.format(path=path, name=name, source=source)
+
+    def runs():
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            runs = f.read().split()
+        os.unlink(path)
+        return runs
+
+    cell.runs = runs
+    return cell
+
+
+def import_again(nbdir, name):
+    nbdir.forget()
+    return importlib.import_module(name)
+
+
+def test_restored(nbdir, log):
+    nbdir.write('mm_restored', [
+        'import json as j',
+        log('load', 'data = list(range(5))'),
+        log('process', 'total = sum(data)\ndata.append(total)'),
+    ])
+    module = importlib.import_module('ipynb.fs.full.mm_restored')
+    assert log.runs() == ['load', 'process']
+    module = import_again(nbdir, 'ipynb.fs.full.mm_restored')
+    assert log.runs() == []
+    assert module.data == [0, 1, 2, 3, 4, 10]
+    assert module.total == 10
+    assert module.j is importlib.import_module('json')
+
+
+def test_changed_cells(nbdir, log):
+    cells = [log('a', 'a = 1'), log('b', 'b = a + 1'), log('c', 'c = b + 1')]
+    nbdir.write('mm_changed', cells)
+    importlib.import_module('ipynb.fs.full.mm_changed')
+    log.runs()
+
+    nbdir.write('mm_changed', cells[:2] + [log('c', 'c = b + 2')])
+    assert import_again(nbdir, 'ipynb.fs.full.mm_changed').c == 4
+    assert log.runs() == ['c']
+
+    nbdir.write('mm_changed', [log('a', 'a = 2')] + cells[1:])
+    assert import_again(nbdir, 'ipynb.fs.full.mm_changed').c == 4
+    assert log.runs() == ['a', 'b', 'c']
+
+
+def test_not_memoized(nbdir, log):
+    nbdir.write('mm_executed', [
+        log('defs', 'def f(x):\n    return x + 1'),
+        log('unpicklable', 'numbers = (i for i in range(3))'),
+        log('data', 'data = f(1)'),
+    ])
+    importlib.import_module('ipynb.fs.full.mm_executed')
+    assert log.runs() == ['defs', 'unpicklable', 'data']
+    module = import_again(nbdir, 'ipynb.fs.full.mm_executed')
+    assert log.runs() == ['defs', 'unpicklable']
+    assert module.data == 2
+    assert list(module.numbers) == [0, 1, 2]
+
+
+def test_imported_notebook_changed(nbdir, log):
+    nbdir.write('mm_dep_leaf', ['VALUE = 1'])
+    nbdir.write('mm_dep', ['from ipynb.fs.full.mm_dep_leaf import VALUE'])
+    nbdir.write('mm_main', [log('main', 'from ipynb.fs.full.mm_dep import VALUE\nresult = VALUE * 2'), log('after', 'x = 1')])
+    assert importlib.import_module('ipynb.fs.full.mm_main').result == 2
+    assert log.runs() == ['main', 'after']
+    assert import_again(nbdir, 'ipynb.fs.full.mm_main').result == 2
+    assert log.runs() == []
+
+    # Changing a notebook imported by the one imported counts too
+    nbdir.write('mm_dep_leaf', ['VALUE = 5'])
+    assert import_again(nbdir, 'ipynb.fs.full.mm_main').result == 10
+    assert log.runs() == ['main', 'after']
+
+
+def test_imported_notebook_imported_before(nbdir, log):
+    nbdir.write('mm_shared_leaf', ['VALUE = 1'])
+    nbdir.write('mm_shared_other', ['from ipynb.fs.full.mm_shared_leaf import VALUE'])
+    nbdir.write('mm_shared_dep', ['from ipynb.fs.full.mm_shared_leaf import VALUE'])
+    nbdir.write('mm_shared', [log('main', 'from ipynb.fs.full.mm_shared_dep import VALUE\nresult = VALUE * 2')])
+
+    def import_in_new_process():
+        nbdir.forget()
+        importers.clear()
+        importlib.import_module('ipynb.fs.full.mm_shared_other')
+        return importlib.import_module('ipynb.fs.full.mm_shared')
+
+    assert import_in_new_process().result == 2
+    assert log.runs() == ['main']
+    nbdir.write('mm_shared_leaf', ['VALUE = 5'])
+    assert import_in_new_process().result == 10
+    assert log.runs() == ['main']
+
+
+def test_notebook_imported_in_function(nbdir, log):
+    nbdir.write('mm_func_dep', ['VALUE = 1'])
+    nbdir.write('mm_func_lazy', ['FACTOR = 2'])
+    nbdir.write('mm_func', [
+        'import importlib\ndef value():\n    from ipynb.fs.full.mm_func_dep import VALUE\n    return VALUE',
+        log('main', 'result = value() * importlib.import_module("ipynb.fs.full.mm_func_lazy").FACTOR'),
+    ])
+
+    def import_in_new_process():
+        nbdir.forget()
+        importers.clear()
+        # Already imported when the function imports it
+        importlib.import_module('ipynb.fs.full.mm_func_dep')
+        return importlib.import_module('ipynb.fs.full.mm_func')
+
+    assert import_in_new_process().result == 2
+    assert log.runs() == ['main']
+    assert import_in_new_process().result == 2
+    assert log.runs() == []
+
+    nbdir.write('mm_func_dep', ['VALUE = 5'])
+    assert import_in_new_process().result == 10
+    assert log.runs() == ['main']
+    # Imported by a call the cell doesn't name an import in
+    nbdir.write('mm_func_lazy', ['FACTOR = 3'])
+    assert import_in_new_process().result == 15
+    assert log.runs() == ['main']
+
+
+def test_other_copies_of_notebook(nbdir, log, tmp_path, monkeypatch):
+    cells = [log('a', 'a = 1')]
+    nbdir.write('mm_copy', cells)
+    importlib.import_module('ipynb.fs.full.mm_copy')
+    assert log.runs() == ['a']
+
+    other = NotebookDir(tmp_path / 'other')
+    monkeypatch.syspath_prepend(other.path)
+    other.write('mm_copy', cells)
+    assert import_again(nbdir, 'ipynb.fs.full.mm_copy').__spec__.origin.startswith(other.path)
+    assert log.runs() == ['a']
+    other.forget()
+
+
+def test_evict(nbdir, log):
+    nbdir.write('mm_evict', [log('a', 'a = "a" * 1000'), log('b', 'b = "b" * 1000')])
+    importlib.import_module('ipynb.fs.full.mm_evict')
+    directory = memo.memo_dir()
+    entries = sorted(os.listdir(directory), key=lambda name: os.stat(os.path.join(directory, name)).st_mtime)
+    assert len(entries) == 2
+    os.utime(os.path.join(directory, entries[0]), (0, 0))
+    memo.evict(os.stat(os.path.join(directory, entries[1])).st_size)
+    assert os.listdir(directory) == entries[1:]
+
+    memo.clear()
+    assert os.listdir(directory) == []
+    import_again(nbdir, 'ipynb.fs.full.mm_evict')
+    assert log.runs() == ['a', 'b', 'a', 'b']
+
+
+def test_disabled(nbdir, log, monkeypatch):
+    monkeypatch.setattr(config, 'memoize_cells', False)
+    nbdir.write('mm_disabled', [log('a', 'a = 1')])
+    importlib.import_module('ipynb.fs.full.mm_disabled')
+    import_again(nbdir, 'ipynb.fs.full.mm_disabled')
+    assert log.runs() == ['a', 'a']
+    assert not os.path.exists(memo.memo_dir())
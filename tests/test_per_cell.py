@@ -0,0 +1,80 @@
+import os
+import importlib
+
+import pytest
+
+from ipynb import config
+from ipynb.fs import cache
+from ipynb.fs.full import FullLoader
+from ipynb.fs.defs import FilteredLoader
+
+
+@pytest.fixture(autouse=True)
+def per_cell(monkeypatch):
+    monkeypatch.setattr(config, 'per_cell', True)
+    monkeypatch.setattr('sys.dont_write_bytecode', False)
+    monkeypatch.setattr('ipynb.fs.loader._cell_codes', {})
+
+
+def test_full(nbdir):
+    nbdir.write('cells_full', ['x = 1', ('markdown', '# title'), 'def f():\n    return x + 1', 'y = f()'])
+    mod = importlib.import_module('ipynb.fs.full.cells_full')
+    assert (mod.x, mod.y) == (1, 2)
+
+
+def test_defs(nbdir):
+    nbdir.write('cells_defs', ['x = 1', 'def f():\n    return X + 1', 'X = 2'])
+    mod = importlib.import_module('ipynb.fs.defs.cells_defs')
+    assert not hasattr(mod, 'x')
+    assert mod.f() == 3
+
+
+def test_only_changed_cells_recompiled(nbdir, monkeypatch):
+    cells = ['a{} = {}'.format(i, i) for i in range(10)]
+    path = nbdir.write('cells_changed', cells)
+    importlib.import_module('ipynb.fs.full.cells_changed')
+    assert os.path.exists(cache.cache_path(path, 'full-cells'))
+    nbdir.forget()
+
+    compiled = []
+    real_code_from_cell = FullLoader.code_from_cell
+    def code_from_cell(self, source):
+        compiled.append(source)
+        return real_code_from_cell(self, source)
+    monkeypatch.setattr(FullLoader, 'code_from_cell', code_from_cell)
+
+    cells[3] = 'a3 = 42'
+    nbdir.write('cells_changed', cells)
+    assert importlib.import_module('ipynb.fs.full.cells_changed').a3 == 42
+    assert compiled == ['a3 = 42']
+
+
+def test_cells_cached_on_disk(nbdir, monkeypatch):
+    path = nbdir.write('cells_disk', ['x = 1', 'y = 2'])
+    loader = FilteredLoader('ipynb.fs.defs.cells_disk', path)
+    loader.get_cell_codes('ipynb.fs.defs.cells_disk')
+    assert len(cache.load_cells(path, 'defs')) == 2
+
+    monkeypatch.setattr('ipynb.fs.loader._cell_codes', {})
+    def fail(self, source):
+        raise AssertionError('cell compiled again')
+    monkeypatch.setattr(FilteredLoader, 'code_from_cell', fail)
+    assert len(loader.get_cell_codes('ipynb.fs.defs.cells_disk')) == 2
+
+
+def test_notebook_line_numbers(nbdir, monkeypatch):
+    cells = ['x = 1', ('markdown', '# title'), 'def g():\n    return 1 / 0', 'def f():\n    return X +']
+    nbdir.write('cells_lines', cells[:3])
+    whole = importlib.import_module('ipynb.fs.full.cells_lines').g.__code__.co_firstlineno
+    assert importlib.import_module('ipynb.fs.defs.cells_lines').g.__code__.co_firstlineno == whole
+    nbdir.forget()
+    monkeypatch.setattr(config, 'per_cell', False)
+    monkeypatch.setattr('ipynb.fs.loader._codes', {})
+    nbdir.write('cells_lines_whole', cells[:3])
+    assert importlib.import_module('ipynb.fs.full.cells_lines_whole').g.__code__.co_firstlineno == whole
+
+    monkeypatch.setattr(config, 'per_cell', True)
+    nbdir.write('cells_lines_error', cells)
+    with pytest.raises(SyntaxError) as e:
+        importlib.import_module('ipynb.fs.full.cells_lines_error')
+    assert e.value.lineno == whole + 4
@@ -0,0 +1,101 @@
+import ast
+import importlib
+
+import pytest
+
+from ipynb import config
+from ipynb.fs import prefetch
+from ipynb.fs.full import FullLoader
+from ipynb.fs.defs import FilteredLoader
+
+
+def test_imported_modules():
+    nodes = ast.parse('\n'.join([
+        'import os, ipynb.fs.full.pkg.a',
+        'from ipynb.fs.defs.b import f',
+        'from ipynb.fs.defs import c',
+        'from . import d',
+        'from ..e import g',
+        'if True:\n    import ipynb.fs.full.h',
+        'def f():\n    import ipynb.fs.full.not_at_import',
+        'import ipynb.fs.full.pkg.a',
+    ])).body
+    assert prefetch.imported_modules(nodes, 'ipynb.fs.defs.pkg') == [
+        'ipynb.fs.full.pkg',
+        'ipynb.fs.full.pkg.a',
+        'ipynb.fs.defs.b',
+        'ipynb.fs.defs.b.f',
+        'ipynb.fs.defs.c',
+        'ipynb.fs.defs.pkg',
+        'ipynb.fs.defs.pkg.d',
+        'ipynb.fs.defs.e',
+        'ipynb.fs.defs.e.g',
+        'ipynb.fs.full.h',
+    ]
+
+
+def test_imported_modules_of_cells():
+    sources = ['import os', 'from ipynb.fs.defs.a import x', 'x = (', 'from ipynb.fs.defs.a import y']
+    assert prefetch.imported_modules_of_cells(sources, '') == [
+        'ipynb.fs.defs.a',
+        'ipynb.fs.defs.a.x',
+        'ipynb.fs.defs.a.y',
+    ]
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(config, 'prefetch', True)
+
+
+@pytest.fixture
+def chain(nbdir, monkeypatch):
+    monkeypatch.setattr('sys.dont_write_bytecode', True)
+    nbdir.write('pf_pkg/__init__', ['X = 1'])
+    nbdir.write('pf_pkg/c', ['C = 3'])
+    nbdir.write('pf_pkg/b', ['from .c import C', 'B = C - 1'])
+    nbdir.write('pf_a', ['from ipynb.fs.defs.pf_pkg.b import B', 'A = B - 1'])
+
+
+def forbid_compiling(monkeypatch):
+    def fail(self, nb):
+        raise AssertionError('{} not prefetched'.format(self.name))
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', fail)
+    monkeypatch.setattr(FilteredLoader, 'code_from_notebook', fail)
+
+
+def test_prefetch_chain(chain, monkeypatch):
+    prefetch.prefetch(['ipynb.fs.full.pf_a'])
+    prefetch.wait()
+    forbid_compiling(monkeypatch)
+    assert importlib.import_module('ipynb.fs.full.pf_a').A == 1
+
+
+def test_prefetch_on_import(chain, monkeypatch):
+    real_code_from_notebook = FullLoader.code_from_notebook
+
+    def code_from_notebook(self, nb):
+        code = real_code_from_notebook(self, nb)
+        # Everything it imports gets loaded meanwhile
+        prefetch.wait()
+        forbid_compiling(monkeypatch)
+        return code
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', code_from_notebook)
+    assert importlib.import_module('ipynb.fs.full.pf_a').A == 1
+
+
+def test_disabled(chain, monkeypatch):
+    monkeypatch.setattr(config, 'prefetch', False)
+    prefetch.prefetch(['ipynb.fs.full.pf_a'])
+    assert prefetch._executor is None
+    assert not prefetch._queued
+
+
+def test_errors_left_to_import(nbdir):
+    nbdir.write('pf_broken', ['x = '])
+    prefetch.prefetch(['ipynb.fs.full.pf_broken', 'ipynb.fs.full.pf_missing'])
+    prefetch.wait()
+    with pytest.raises(SyntaxError):
+        importlib.import_module('ipynb.fs.full.pf_broken')
+    with pytest.raises(ImportError):
+        importlib.import_module('ipynb.fs.full.pf_missing')
@@ -0,0 +1,67 @@
+import importlib
+
+import pytest
+
+from ipynb import profile
+
+
+@pytest.fixture(autouse=True)
+def profiled():
+    profile.reset()
+    profile.enable(memory=True)
+    yield
+    profile.disable()
+    profile.reset()
+
+
+def test_report(nbdir):
+    nbdir.write('pr_child', ['import time\ntime.sleep(0.02)'])
+    nbdir.write('pr_parent', [
+        'import time',
+        ('markdown', 'Slow ones'),
+        'time.sleep(0.05)',
+        'data = [0] * 1000000',
+        'import ipynb.fs.full.pr_child',
+    ])
+    module = importlib.import_module('ipynb.fs.full.pr_parent')
+    assert len(module.data) == 1000000
+
+    report = profile.report()
+    parent = [r for r in report if r['module'] == 'ipynb.fs.full.pr_parent']
+    assert [r['index'] for r in parent[:2]] == [2, 4]
+    assert parent[0]['line'] == 'time.sleep(0.05)'
+    assert parent[0]['seconds'] >= 0.05
+    # The child's cell is recorded on its own, and counts for the importing cell
+    importing = parent[1]
+    [child] = [r for r in report if r['module'] == 'ipynb.fs.full.pr_child']
+    assert importing['seconds'] >= child['seconds'] >= 0.02
+    assert importing['self_seconds'] == pytest.approx(importing['seconds'] - child['seconds'])
+
+    [allocating] = profile.report(by='memory')[:1]
+    assert allocating['index'] == 3
+    assert allocating['memory'] > 7000000
+
+
+def test_cell_ids(nbdir):
+    path = nbdir.write('pr_ids', ['x = 1', 'y = x + 1'])
+    with open(path) as f:
+        content = f.read()
+    with open(path, 'w') as f:
+        f.write(content.replace('"cell_type": "code",', '"cell_type": "code", "id": "cell-id",', 1))
+    assert importlib.import_module('ipynb.fs.defs.pr_ids')
+    assert sorted((r['index'], r['id']) for r in profile.report()) == [(0, 'cell-id'), (1, None)]
+
+
+def test_format_report(nbdir):
+    nbdir.write('pr_format', ['import time\ntime.sleep(0.01)', 'x = 1'])
+    importlib.import_module('ipynb.fs.full.pr_format')
+    lines = profile.format_report(limit=1).splitlines()
+    assert len(lines) == 2
+    assert lines[1].endswith('ipynb.fs.full.pr_format[0] import time')
+
+
+def test_disabled(nbdir):
+    profile.disable()
+    nbdir.write('pr_disabled', ['x = 1'])
+    importlib.import_module('ipynb.fs.full.pr_disabled')
+    assert profile.report() == []
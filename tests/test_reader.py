@@ -0,0 +1,139 @@
+import os
+import json
+
+import pytest
+
+from ipynb import reader
+from ipynb.reader import read_notebook
+
+
+@pytest.fixture(autouse=True, params=['json', 'scanner', 'scanner-small-values'])
+def mode(request, monkeypatch):
+    """
+    Run each test with small notebooks decoded by json, and with the scanner
+    """
+    if request.param != 'json':
+        monkeypatch.setattr(reader, 'SMALL_NOTEBOOK', 0)
+    if request.param == 'scanner':
+        monkeypatch.setattr(reader, 'SMALL_VALUE', 0)
+    return request.param
+
+
+NOTEBOOK = {
+    'cells': [
+        {
+            'cell_type': 'markdown',
+            'metadata': {},
+            'attachments': {'image.png': {'image/png': 'iVBORw0KGgo' * 100}},
+            'source': ['# Title\n', 'with "quotes" and \\backslashes\\ and é'],
+        },
+        {
+            'cell_type': 'code',
+            'id': 'a1b2c3',
+            'execution_count': 3,
+            'metadata': {'collapsed': True, 'tags': ['a', 'b']},
+            'outputs': [
+                {'output_type': 'display_data', 'data': {'image/png': 'AAAA' * 10000, 'text/html': ['<b>]}[{</b>']}},
+                {'output_type': 'stream', 'name': 'stdout', 'text': ['"}\\"', '\\\\']},
+            ],
+            'source': 'x = {"a": [1, 2]}',
+        },
+    ],
+    'metadata': {
+        'kernelspec': {'display_name': 'Python 3', 'language': 'python', 'name': 'python3'},
+        'language_info': {'codemirror_mode': {'name': 'ipython', 'version': 3}},
+    },
+    'nbformat': 4,
+    'nbformat_minor': 2,
+}
+
+
+@pytest.mark.parametrize('indent', [None, 1])
+def test_read_notebook(indent):
+    nb = read_notebook(json.dumps(NOTEBOOK, indent=indent).encode('utf-8'))
+    assert nb == {
+        'nbformat': 4,
+        'metadata': {'kernelspec': {'language': 'python'}},
+        'cells': [
+            {'cell_type': 'markdown', 'source': NOTEBOOK['cells'][0]['source']},
+            {
+                'cell_type': 'code',
+                'source': NOTEBOOK['cells'][1]['source'],
+                'id': 'a1b2c3',
+                'metadata': {'tags': ['a', 'b']},
+            },
+        ],
+    }
+
+
+def test_read_test_notebooks():
+    here = os.path.dirname(__file__)
+    for path in ['pure_ipynb/foo.ipynb', 'older_nbformat.ipynb', 'r_notebook.ipynb']:
+        with open(os.path.join(here, path), 'rb') as f:
+            data = f.read()
+        full = json.loads(data.decode('utf-8'))
+        nb = read_notebook(data)
+        assert nb['nbformat'] == full['nbformat']
+        assert nb['metadata'].get('kernelspec') == (
+            {'language': full['metadata']['kernelspec']['language']}
+            if 'kernelspec' in full['metadata'] else None
+        )
+        assert nb.get('cells') == (
+            [{'cell_type': c['cell_type'], 'source': c['source']} for c in full['cells']]
+            if 'cells' in full else None
+        )
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'# not json',
+    b'[]',
+    b'{"cells": [{"source": "x"}',
+    b'{"cells": [], "nbformat": 4} trailing',
+    b'{"metadata": {"a": "unterminated}}',
+    b'{"cells": [1]}',
+    b'{"cells": [{"source": "x"}, {"source": }]}',
+])
+def test_invalid_json(data):
+    with pytest.raises(ValueError):
+        read_notebook(data)
+
+
+def test_parse_cache_lru():
+    cache = reader.ParseCache(max_size=10)
+    stats = {'mtime': 1.0, 'size': 100}
+    a = {'cells': [{'cell_type': 'code', 'source': ['1234']}]}
+    b = {'cells': [{'cell_type': 'code', 'source': ['12', '34']}]}
+    c = {'cells': [{'cell_type': 'code', 'source': '1234'}]}
+    cache.put('a', stats, a)
+    cache.put('b', stats, b)
+    assert cache.get('a', stats) is a
+    assert cache.get('a', {'mtime': 2.0, 'size': 100}) is None
+    cache.put('c', stats, c)
+    # b was the least recently used
+    assert cache.get('b', stats) is None
+    assert cache.get('c', stats) is c
+    assert cache.info() == {
+        'hits': 2, 'misses': 2, 'evictions': 1, 'entries': 2, 'size': 8, 'max_size': 10,
+    }
+    cache.put('big', stats, {'cells': [{'cell_type': 'code', 'source': 'x' * 11}]})
+    assert cache.get('big', stats) is None
+    assert cache.info()['size'] == 8
+
+
+def test_parse_cache_shared(nbdir, monkeypatch):
+    from ipynb.fs import loader
+    calls = []
+    real_read_notebook = loader.read_notebook
+    def read_notebook(data):
+        calls.append(1)
+        return real_read_notebook(data)
+    monkeypatch.setattr(loader, 'read_notebook', read_notebook)
+    monkeypatch.setattr('sys.dont_write_bytecode', True)
+
+    nbdir.write('shared_parse', ['x = 1', 'Y = 2'])
+    import ipynb.fs.full.shared_parse
+    import ipynb.fs.defs.shared_parse
+    assert ipynb.fs.full.shared_parse.x == 1
+    assert ipynb.fs.defs.shared_parse.Y == 2
+    assert len(calls) == 1
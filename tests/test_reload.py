@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import threading
+import importlib
+
+import pytest
+
+from ipynb import reload
+
+
+def rewrite(nbdir, name, cells):
+    """
+    Write the notebook again, making sure its stats change
+    """
+    path = nbdir.write(name, cells)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    return path
+
+
+def test_notebook_modules(nbdir):
+    path = nbdir.write('rl_listed', ['x = 1'])
+    importlib.import_module('ipynb.fs.full.rl_listed')
+    importlib.import_module('ipynb.fs.defs.rl_listed')
+    modules = reload.notebook_modules()
+    assert modules['ipynb.fs.full.rl_listed'] == path
+    assert modules['ipynb.fs.defs.rl_listed'] == path
+
+
+def test_source_hash_ignores_outputs(nbdir):
+    path = nbdir.write('rl_hash', ['x = 1', ('markdown', 'Hi')])
+    before = reload.source_hash(path)
+    with open(path) as f:
+        nb = json.load(f)
+    nb['cells'][0]['outputs'] = [{'output_type': 'stream', 'name': 'stdout', 'text': ['1\n']}]
+    nb['cells'][0]['execution_count'] = 3
+    nb['metadata']['widgets'] = {}
+    with open(path, 'w') as f:
+        json.dump(nb, f)
+    assert reload.source_hash(path) == before
+
+    nbdir.write('rl_hash', ['x = 2', ('markdown', 'Hi')])
+    assert reload.source_hash(path) != before
+
+
+def test_check_reloads_changed_code(nbdir):
+    nbdir.write('rl_changed', ['X = 1'])
+    module = importlib.import_module('ipynb.fs.full.rl_changed')
+    watcher = reload.Watcher()
+    assert watcher.check() == []
+
+    rewrite(nbdir, 'rl_changed', ['X = 2'])
+    assert watcher.check() == ['ipynb.fs.full.rl_changed']
+    assert module.X == 2
+    assert watcher.check() == []
+
+
+def test_check_ignores_output_changes(nbdir):
+    path = nbdir.write('rl_outputs', ['import itertools\nCOUNTER = itertools.count()'])
+    module = importlib.import_module('ipynb.fs.full.rl_outputs')
+    counter = module.COUNTER
+    watcher = reload.Watcher()
+
+    with open(path) as f:
+        nb = json.load(f)
+    nb['cells'][0]['execution_count'] = 7
+    with open(path, 'w') as f:
+        json.dump(nb, f)
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    assert watcher.check() == []
+    assert module.COUNTER is counter
+
+
+def test_check_reloads_dependents(nbdir):
+    nbdir.write('rl_base', ['VALUE = 1'])
+    nbdir.write('rl_user', ['from ipynb.fs.full.rl_base import VALUE'])
+    nbdir.write('rl_top', ['import ipynb.fs.full.rl_user as user\nVALUE = user.VALUE'])
+    top = importlib.import_module('ipynb.fs.full.rl_top')
+    assert top.VALUE == 1
+
+    watcher = reload.Watcher(dependents=True)
+    rewrite(nbdir, 'rl_base', ['VALUE = 2'])
+    assert watcher.check() == ['ipynb.fs.full.rl_base', 'ipynb.fs.full.rl_user', 'ipynb.fs.full.rl_top']
+    assert top.VALUE == 2
+
+
+def test_check_without_dependents(nbdir):
+    nbdir.write('rl_lib', ['VALUE = 1'])
+    nbdir.write('rl_app', ['from ipynb.fs.full.rl_lib import VALUE'])
+    app = importlib.import_module('ipynb.fs.full.rl_app')
+
+    watcher = reload.Watcher()
+    rewrite(nbdir, 'rl_lib', ['VALUE = 2'])
+    assert watcher.check() == ['ipynb.fs.full.rl_lib']
+    assert app.VALUE == 1
+
+
+def test_background_thread(nbdir):
+    nbdir.write('rl_thread', ['X = 1'])
+    module = importlib.import_module('ipynb.fs.full.rl_thread')
+    reloaded = threading.Event()
+    watcher = reload.Watcher(interval=0.05, callback=lambda names: reloaded.set())
+    watcher.start()
+    try:
+        rewrite(nbdir, 'rl_thread', ['X = 2'])
+        assert reloaded.wait(5)
+    finally:
+        watcher.stop()
+    assert module.X == 2
+
+
+def test_check_reloads_every_dependent(nbdir):
+    nbdir.write('rl_shared', ['VALUE = 1'])
+    nbdir.write('rl_first', ['from ipynb.fs.full.rl_shared import VALUE'])
+    nbdir.write('rl_second', ['from ipynb.fs.full.rl_shared import VALUE'])
+    first = importlib.import_module('ipynb.fs.full.rl_first')
+    # rl_shared is already imported by then
+    second = importlib.import_module('ipynb.fs.full.rl_second')
+
+    watcher = reload.Watcher(dependents=True)
+    rewrite(nbdir, 'rl_shared', ['VALUE = 2'])
+    assert sorted(watcher.check()) == ['ipynb.fs.full.rl_first', 'ipynb.fs.full.rl_second', 'ipynb.fs.full.rl_shared']
+    assert (first.VALUE, second.VALUE) == (2, 2)
+
+
+def test_check_reloads_lazy_definitions(nbdir, monkeypatch):
+    monkeypatch.setattr('ipynb.config.lazy_defs', True)
+    nbdir.write('rl_lazy', ['def f():\n    return 1'])
+    module = importlib.import_module('ipynb.fs.defs.rl_lazy')
+    assert module.f() == 1
+
+    watcher = reload.Watcher()
+    rewrite(nbdir, 'rl_lazy', ['def f():\n    return 2'])
+    assert watcher.check() == ['ipynb.fs.defs.rl_lazy']
+    assert module.f() == 2
+
+
+@pytest.mark.parametrize('disassembled', [False, True])
+@pytest.mark.filterwarnings('error')
+def test_imported_names(disassembled, monkeypatch):
+    from ipynb.fs.loader import imported_names
+    if disassembled:
+        # As when imports are compiled to something else than expected
+        monkeypatch.setattr('ipynb.fs.loader._LOAD_CONST', -1)
+    # Enough names & constants for EXTENDED_ARG prefixes
+    padding = ''.join('x{0} = {0}.5\n'.format(i) for i in range(300))
+    code = compile(padding + 'import a.b as c\nfrom ..d import e\nfrom . import *\ndef f():\n    import g\n', 'nb', 'exec')
+    assert imported_names(code, 'pkg.sub') == ['a.b', 'pkg.d', 'pkg.d.e', 'pkg.sub']
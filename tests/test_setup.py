@@ -0,0 +1,45 @@
+import os
+
+from ipynb.setup import find_packages, py_path
+from ipynb.utils import code_from_ipynb
+from ipynb.reader import read_notebook
+
+
+def test_find_packages(nbdir):
+    init = nbdir.write('pkg/__init__', ['from .mod import f'])
+    mod = nbdir.write('pkg/mod', ['def f():\n    return 1', ('markdown', 'Some text')])
+    nbdir.write('pkg/sub/mod', ['X = 1'])
+    nbdir.write('notpkg/mod', ['X = 1'])
+
+    assert find_packages(nbdir.path) == ['pkg']
+    for ipynb in (init, mod):
+        with open(ipynb, 'rb') as f:
+            expected = code_from_ipynb(read_notebook(f.read()), markdown=True)
+        with open(py_path(ipynb)) as f:
+            assert f.read() == expected
+    assert not os.path.exists(os.path.join(nbdir.path, 'pkg', 'sub', 'mod.py'))
+    assert not os.path.exists(os.path.join(nbdir.path, 'notpkg', 'mod.py'))
+
+
+def test_up_to_date_not_rewritten(nbdir):
+    mod = nbdir.write('pkg/mod', ['X = 1'])
+    nbdir.write('pkg/__init__', [])
+    find_packages(nbdir.path)
+    before = os.stat(py_path(mod))
+
+    # Newer notebook, but same code: only the outputs changed
+    st = os.stat(mod)
+    os.utime(mod, (st.st_atime, before.st_mtime + 10))
+    find_packages(nbdir.path)
+    after = os.stat(py_path(mod))
+    assert (after.st_ino, after.st_mtime) == (before.st_ino, before.st_mtime)
+
+    nbdir.write('pkg/mod', ['X = 2'])
+    os.utime(mod, (st.st_atime, before.st_mtime + 20))
+    find_packages(nbdir.path)
+    with open(py_path(mod)) as f:
+        assert 'X = 2' in f.read()
+
+
+def test_py_path_keeps_directories():
+    assert py_path('/src/ipynb_stuff/nb.ipynb') == '/src/ipynb_stuff/nb.py'
@@ -0,0 +1,79 @@
+import json
+import importlib
+
+import pytest
+
+from ipynb import config
+from ipynb.fs.tagged import TaggedLoader
+
+
+def tag(nbdir, name, cells):
+    """
+    Write a notebook of code cells, given as (source, tags)
+    """
+    path = nbdir.write(name, [source for source, _ in cells])
+    with open(path) as f:
+        nb = json.load(f)
+    for cell, (_, tags) in zip(nb['cells'], cells):
+        cell['metadata']['tags'] = tags
+    with open(path, 'w') as f:
+        json.dump(nb, f)
+    return path
+
+
+CELLS = [
+    ('ALPHA = 0.1', ['parameters']),
+    ('import math\nSCALE = 2', []),
+    ('raise RuntimeError("training")', ['heavy']),
+    ('plotted = True', ['skip-import', 'plot']),
+    ('def f(x):\n    return x * SCALE * ALPHA', []),
+]
+
+
+def test_default_selection(nbdir):
+    tag(nbdir, 'tg_default', CELLS)
+    module = importlib.import_module('ipynb.fs.tagged.tg_default')
+    assert module.f(10) == pytest.approx(2)
+    assert not hasattr(module, 'plotted')
+    with pytest.raises(RuntimeError):
+        importlib.import_module('ipynb.fs.full.tg_default')
+
+
+def test_include_tags(nbdir, monkeypatch):
+    monkeypatch.setattr(config, 'include_tags', {'parameters', 'plot'})
+    tag(nbdir, 'tg_include', CELLS)
+    module = importlib.import_module('ipynb.fs.tagged.tg_include')
+    assert module.ALPHA == 0.1
+    # Excluded tags win over included ones
+    assert not hasattr(module, 'plotted')
+    assert not hasattr(module, 'f')
+
+
+def test_line_numbers(nbdir, monkeypatch):
+    tag(nbdir, 'tg_lines', CELLS + [('def g():\n    raise ValueError()', [])])
+    tagged = importlib.import_module('ipynb.fs.tagged.tg_lines')
+    nbdir.forget()
+    monkeypatch.setattr(config, 'exclude_tags', {'heavy'})
+    # Only the heavy cell left out, it's a one liner
+    more = importlib.import_module('ipynb.fs.tagged.tg_lines')
+    assert tagged.g.__code__.co_firstlineno == more.g.__code__.co_firstlineno
+    assert tagged.f.__code__.co_firstlineno == more.f.__code__.co_firstlineno
+
+
+def test_selection_keys_the_cache(nbdir, monkeypatch):
+    monkeypatch.setattr('sys.dont_write_bytecode', False)
+    path = tag(nbdir, 'tg_cached', CELLS)
+    assert not hasattr(importlib.import_module('ipynb.fs.tagged.tg_cached'), 'plotted')
+    nbdir.forget()
+    monkeypatch.setattr(config, 'exclude_tags', {'heavy'})
+    assert importlib.import_module('ipynb.fs.tagged.tg_cached').plotted
+    default = TaggedLoader('ipynb.fs.tagged.tg_cached', path)
+    assert default.flavor.startswith('tagged-')
+    monkeypatch.setattr(config, 'exclude_tags', {'skip-import', 'heavy'})
+    assert TaggedLoader('ipynb.fs.tagged.tg_cached', path).flavor != default.flavor
+
+
+def test_per_cell(nbdir, monkeypatch):
+    monkeypatch.setattr(config, 'per_cell', True)
+    tag(nbdir, 'tg_per_cell', CELLS)
+    assert importlib.import_module('ipynb.fs.tagged.tg_per_cell').f(10) == pytest.approx(2)
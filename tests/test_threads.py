@@ -0,0 +1,141 @@
+import time
+import threading
+import importlib
+
+import pytest
+
+from ipynb import config
+from ipynb.fs import loader
+from ipynb.fs.flight import SingleFlight
+from ipynb.fs.full import FullLoader
+from ipynb.fs.defs import FilteredLoader
+
+THREADS = 16
+
+
+def run_threads(target, n=THREADS):
+    """
+    Run target(i) in n threads started at once, returning what each returned
+    """
+    barrier = threading.Barrier(n)
+    results = [None] * n
+    errors = []
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = target(i)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """
+    Count the notebooks read & compiled, slowing them down to make races likely
+    """
+    counts = {'read': 0, 'full': 0, 'defs': 0}
+    lock = threading.Lock()
+
+    def counting(name, function):
+        def wrapper(*args):
+            with lock:
+                counts[name] += 1
+            time.sleep(0.02)
+            return function(*args)
+        return wrapper
+
+    monkeypatch.setattr(loader, 'read_notebook', counting('read', loader.read_notebook))
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', counting('full', FullLoader.code_from_notebook))
+    monkeypatch.setattr(FilteredLoader, 'code_from_notebook', counting('defs', FilteredLoader.code_from_notebook))
+    monkeypatch.setattr('sys.dont_write_bytecode', True)
+    return counts
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    calls = []
+
+    def work(i):
+        calls.append(i)
+        time.sleep(0.05)
+        return object()
+
+    results = run_threads(lambda i: flight.do('key', work, i))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_single_flight_failure_retried():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.05)
+        raise ValueError('nope')
+
+    def call(i):
+        with pytest.raises(ValueError):
+            flight.do('key', work)
+
+    run_threads(call, 4)
+    assert 1 <= len(calls) <= 4
+    assert flight.do('key', lambda: 1) == 1
+
+
+def test_concurrent_imports(nbdir, counted):
+    nbdir.write('contended', ['import time\nx = 1', 'time.sleep(0.01)', 'def f():\n    return x', 'Z = 2'])
+    names = ['ipynb.fs.full.contended', 'ipynb.fs.defs.contended']
+    modules = run_threads(lambda i: importlib.import_module(names[i % 2]))
+
+    for i, module in enumerate(modules):
+        assert module is modules[i % 2]
+        # Fully executed, whenever the thread got it
+        assert module.Z == 2
+    assert modules[0].f() == 1
+    assert counted == {'read': 1, 'full': 1, 'defs': 1}
+
+
+def test_concurrent_get_code(nbdir, counted):
+    path = nbdir.write('loaded', ['x = 1'])
+
+    def get_code(i):
+        loader_class = FullLoader if i % 2 else FilteredLoader
+        return loader_class('ipynb.fs.{}.loaded'.format(loader_class.flavor), path).get_code('loaded')
+
+    codes = run_threads(get_code)
+    assert counted == {'read': 1, 'full': 1, 'defs': 1}
+    assert all(code is codes[1] for code in codes[1::2])
+    assert all(code is codes[0] for code in codes[0::2])
+
+
+def test_concurrent_cells(nbdir, counted, monkeypatch):
+    monkeypatch.setattr(config, 'per_cell', True)
+    path = nbdir.write('cells', ['x = 1', 'y = x + 1'])
+    compiled = []
+    monkeypatch.setattr(FullLoader, 'code_from_cell', lambda self, source: compiled.append(source) or compile(source, path, 'exec'))
+
+    def get_cell_codes(i):
+        return FullLoader('ipynb.fs.full.cells', path).get_cell_codes('ipynb.fs.full.cells')
+
+    codes = run_threads(get_cell_codes)
+    assert sorted(compiled) == ['x = 1', 'y = x + 1']
+    assert all(c == codes[0] for c in codes)
+
+
+def test_concurrent_lazy_access(nbdir, monkeypatch):
+    monkeypatch.setattr(config, 'lazy_defs', True)
+    nbdir.write('lazy_contended', ['import time', 'TOKEN = time.sleep(0.05) or object()'])
+    module = importlib.import_module('ipynb.fs.defs.lazy_contended')
+    tokens = run_threads(lambda i: module.TOKEN)
+    assert all(token is tokens[0] for token in tokens)
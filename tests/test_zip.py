@@ -0,0 +1,89 @@
+import os
+import sys
+import zipfile
+import importlib
+
+import pytest
+
+from ipynb import compileall
+from ipynb.fs.full import FullLoader
+from ipynb.fs.zip import ZipLoaderMixin
+from ipynb.fs.loader import read_only_loader
+from conftest import make_notebook
+
+
+@pytest.fixture
+def archive(tmp_path_factory, monkeypatch):
+    """
+    Return a function writing a zip archive of notebooks, added to sys.path
+    """
+    monkeypatch.setattr('sys.dont_write_bytecode', False)
+    directory = tmp_path_factory.mktemp('archives')
+    names = []
+
+    def write(notebooks, name='notebooks.zip', entry='', tree=None):
+        path = str(directory / name)
+        with zipfile.ZipFile(path, 'w') as zf:
+            for nb_name, cells in notebooks.items():
+                zf.writestr(nb_name + '.ipynb', make_notebook(cells))
+            if tree is not None:
+                for root, _, files in os.walk(tree):
+                    for filename in files:
+                        full_path = os.path.join(root, filename)
+                        zf.write(full_path, os.path.relpath(full_path, tree))
+        sys.path.append(os.path.join(path, entry) if entry else path)
+        importlib.invalidate_caches()
+        names.append(path)
+        return path
+
+    yield write
+    for name, module in list(sys.modules.items()):
+        origin = getattr(getattr(module, '__spec__', None), 'origin', None) or ''
+        if any(origin.startswith(path) for path in names):
+            del sys.modules[name]
+    for path in names:
+        sys.path[:] = [p for p in sys.path if not p.startswith(path)]
+
+
+def test_import_from_zip(archive):
+    path = archive({
+        'zipped': ['x = 1', 'def f():\n    return x'],
+        'zpkg/__init__': ['X = 2'],
+        'zpkg/sub': ['Y = 3\ny = 4'],
+    })
+    full = importlib.import_module('ipynb.fs.full.zipped')
+    assert full.f() == 1
+    assert full.__spec__.origin == os.path.join(path, 'zipped.ipynb')
+    assert type(full.__loader__) is read_only_loader(ZipLoaderMixin, FullLoader)
+    defs = importlib.import_module('ipynb.fs.defs.zipped')
+    assert not hasattr(defs, 'x')
+    assert importlib.import_module('ipynb.fs.full.zpkg').X == 2
+    sub = importlib.import_module('ipynb.fs.defs.zpkg.sub')
+    assert sub.Y == 3
+    assert not hasattr(sub, 'y')
+    # Nothing gets written next to, nor into the archive
+    assert os.listdir(os.path.dirname(path)) == ['notebooks.zip']
+    with zipfile.ZipFile(path) as zf:
+        assert len(zf.namelist()) == 3
+
+
+def test_directory_in_zip(archive):
+    archive({'lib/inner': ['x = 5'], 'outer': ['x = 6']}, entry='lib')
+    assert importlib.import_module('ipynb.fs.full.inner').x == 5
+    with pytest.raises(ImportError):
+        importlib.import_module('ipynb.fs.full.outer')
+
+
+def test_precompiled_zip(archive, nbdir, monkeypatch):
+    nbdir.write('zprecompiled', ['x = 1'])
+    assert compileall.main(['-q', nbdir.path]) == 0
+    archive({}, tree=nbdir.path)
+    sys.path.remove(nbdir.path)
+    importlib.invalidate_caches()
+
+    def fail(*args):
+        raise AssertionError('notebook compiled again')
+    monkeypatch.setattr(FullLoader, 'code_from_notebook', fail)
+    module = importlib.import_module('ipynb.fs.full.zprecompiled')
+    assert module.x == 1
+    assert '.zip' in module.__spec__.origin